@@ -5,9 +5,17 @@ Improved Aristocrat (simple substitution) solver with enhanced crib handling.
 
 import random
 import math
-import collections
+import functools
+import multiprocessing
+import os
 import re
-from copy import deepcopy
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # no numba: the annealer core runs as plain Python
+    njit = None
 
 # --------- User: paste your ciphertext here ----------
 ciphertext = """WUOCWCIML FZOC IZVVZMXOCL. MFCR MCBB LMUVXCL, ACDZNLC MFCR ZVC IUM GNLM ZAUNM VCZVVZIEXIE CDUIUWXDL ZIY JUBXMXDL. MFCR ZBLU VCZVVZIEC WCZIXIE. ZIY MFCR'VC IUM GNLM ZAUNM VCYXLMVXANMXIE MFC EUUYL. MFCR'VC ZAUNM TXENVXIE UNM PFZM XL EUUY."""
@@ -23,128 +31,397 @@ def normalize_ciphertext(ct):
     ct = re.sub(r"\s+", " ", ct)
     return ct.strip()
 
+# Every byte except A-Z, for bytes.translate to delete
+_NON_ALPHA = bytes(b for b in range(256) if not 65 <= b <= 90)
+
+def letter_bytes(s):
+    return upper_letter_bytes(s.upper())
+
+# Same, for text that is already upper-cased
+def upper_letter_bytes(text_u):
+    return text_u.encode('ascii', 'ignore').translate(None, _NON_ALPHA)
+
 def letters_only(s):
-    return ''.join([c for c in s.upper() if c.isalpha()])
+    return letter_bytes(s).decode('ascii')
 
 # ----------------- key / translation functions -----------------
-def random_key():
-    letters = list(ALPHABET)
-    shuffled = letters[:]
-    random.shuffle(shuffled)
-    return dict(zip(ALPHABET, shuffled))
+# A key is 26 bytes: key[i] is the plaintext letter index (0 = 'A') for
+# ciphertext letter ALPHABET[i]
+def random_key(rng=random):
+    key = bytearray(range(26))
+    rng.shuffle(key)
+    return bytes(key)
+
+# 256-byte table for str.translate; code points past 255 are left alone
+_KEY_SOURCE = (ALPHABET + ALPHABET.lower()).encode('ascii')
+_IDX_TO_UPPER = bytes.maketrans(bytes(range(26)), ALPHABET.encode('ascii'))
+_IDX_TO_LOWER = bytes.maketrans(bytes(range(26)), ALPHABET.lower().encode('ascii'))
 
 def key_to_trans_table(key):
-    trans = {}
-    for c in ALPHABET:
-        trans[ord(c)] = ord(key[c])
-        trans[ord(c.lower())] = ord(key[c].lower())
-    return trans
+    plain = key.translate(_IDX_TO_UPPER) + key.translate(_IDX_TO_LOWER)
+    return bytes.maketrans(_KEY_SOURCE, plain)
 
 def decrypt_with_key(cipher, key):
     table = key_to_trans_table(key)
     return cipher.translate(table)
 
-# Swap two ciphertext->plaintext mappings (mutate)
-def mutate_key_random(key):
-    new = key.copy()
-    a, b = random.sample(ALPHABET, 2)
-    new[a], new[b] = new[b], new[a]
-    return new
-
-def mutate_key_guided(key):
-    if random.random() < 0.6:
-        choices = list(ALPHABET)
-        a = random.choice(choices)
-        b = random.choice(choices)
-        if random.random() < 0.1:
-            c = random.choice(choices)
-            new = key.copy()
-            new[a], new[b], new[c] = new[c], new[a], new[b]
-            return new
-        new = key.copy()
-        new[a], new[b] = new[b], new[a]
-        return new
-    else:
-        return mutate_key_random(key)
-
 # ----------------- scoring functions -----------------
 BIGRAM_COUNTS = {
     "TH": 20000, "HE": 18000, "IN": 12000, "ER": 11000, "AN": 10000, "RE": 9000,
     "ND": 8000, "AT": 7500, "ON": 7000, "NT": 6800, "HA": 6500, "ES": 6400,
     "ST": 6300, "EN": 6200, "ED": 6100, "OR": 6000, "TI": 5900, "TE": 5800,
     "NG": 5700, "OF": 5600, "IT": 5500, "IS": 5400, "AL": 5300, "AR": 5200,
-    "AS": 5100, "OR": 5000, "SE": 4800, "LE": 4700, "SA": 4600, "VE": 4500,
+    "AS": 5100, "SE": 4800, "LE": 4700, "SA": 4600, "VE": 4500,
 }
 TOTAL_BIGRAMS = sum(BIGRAM_COUNTS.values())
 BIGRAM_FLOOR = 0.01
 
-def letters_only(s):
-    return ''.join([c for c in s.upper() if c.isalpha()])
+# LOGP[i, j] = log P(bigram) for letter indices i, j (0 = 'A'): one log over
+# the count table, with the log(TOTAL_BIGRAMS) normaliser subtracted once
+_COUNTS = np.full((26, 26), BIGRAM_FLOOR)
+for bg, count in BIGRAM_COUNTS.items():
+    _COUNTS[ord(bg[0]) - 65, ord(bg[1]) - 65] = count
+LOGP = np.log(_COUNTS) - math.log(TOTAL_BIGRAMS)
+
+def _letters_to_idx(text):
+    return np.frombuffer(letter_bytes(text), dtype=np.uint8) - ord('A')
+
+def _upper_letters_to_idx(text_u):
+    return np.frombuffer(upper_letter_bytes(text_u), dtype=np.uint8) - ord('A')
 
 def bigram_score(text):
-    txt = letters_only(text)
-    if len(txt) < 2:
+    return letters_bigram_score(_letters_to_idx(text))
+
+def letters_bigram_score(idx):
+    if len(idx) < 2:
         return -9999.0
-    score = 0.0
-    for i in range(len(txt)-1):
-        bg = txt[i:i+2]
-        count = BIGRAM_COUNTS.get(bg, BIGRAM_FLOOR)
-        score += math.log(count) - math.log(TOTAL_BIGRAMS)
-    return score
+    return float(LOGP[idx[:-1], idx[1:]].sum())
 
 # Crib scoring: reward presence of hardcoded cribs
+CRIB_WEIGHT = 500  # strong boost per occurrence
+
+# Compiled once: whole-word matches of any crib in a single pass, and each
+# crib's word shape (letters as [A-Z], punctuation kept) for locating crib
+# slots. One alternation counts the same matches as one pattern per crib as
+# long as no crib is a whole-word piece of another (e.g. "WE" and "WE'RE").
+CRIB_RE = re.compile(
+    r'\b(?:' + '|'.join(sorted(map(re.escape, HARD_CRIBS), key=len, reverse=True)) + r')\b'
+)
+CRIB_SHAPES = [
+    re.compile(r'(?=\b(' + ''.join('[A-Z]' if c in ALPHABET else re.escape(c) for c in crib)
+               + r')\b)')
+    for crib in HARD_CRIBS
+]
+
 def crib_bonus(text):
-    bonus = 0
-    for crib in HARD_CRIBS:
-        # regex match for whole word
-        matches = re.findall(rf'\b{crib}\b', text.upper())
-        bonus += 500 * len(matches)  # strong boost per occurrence
-    return bonus
+    return upper_crib_bonus(text.upper())
 
+def upper_crib_bonus(text_u):
+    return CRIB_WEIGHT * len(CRIB_RE.findall(text_u))
+
+# Upper-case once here and hand the same string to both scorers
 def combined_fitness(text):
-    return bigram_score(text) + crib_bonus(text)
+    text_u = text.upper()
+    return letters_bigram_score(_upper_letters_to_idx(text_u)) + upper_crib_bonus(text_u)
+
+# Every spot in the ciphertext whose word shape fits a crib, flattened to
+# (letter positions, crib letter indices, slot offsets) over the letters-only
+# text; slot k covers entries slot_start[k]:slot_start[k + 1]. The punctuation
+# never changes under a key, so crib_bonus reduces to checking these slots
+# against the plaintext letters.
+def crib_slots(cipher):
+    text = cipher.upper()
+    letter_pos = {}
+    for i, c in enumerate(text):
+        if c in ALPHABET:
+            letter_pos[i] = len(letter_pos)
+    pos, target, start = [], [], [0]
+    for crib, shape in zip(HARD_CRIBS, CRIB_SHAPES):
+        for m in shape.finditer(text):
+            for i, c in zip(range(m.start(1), m.end(1)), crib):
+                if c in ALPHABET:
+                    pos.append(letter_pos[i])
+                    target.append(ord(c) - 65)
+            start.append(len(pos))
+    return (np.array(pos, dtype=np.int64), np.array(target, dtype=np.int64),
+            np.array(start, dtype=np.int64))
 
 # ----------------- annealing / solver -----------------
-def simulated_anneal(cipher, initial_key=None, start_temp=1.0, end_temp=0.001, steps=4000, mutate_fn=None):
-    if initial_key is None:
-        key = random_key()
-    else:
-        key = initial_key.copy()
-    if mutate_fn is None:
-        mutate_fn = mutate_key_guided
+# The core below only touches NumPy arrays and scalars so numba can compile
+# it; without numba the same code runs as (much slower) plain Python.
+def _jit(fn):
+    return njit(cache=True)(fn) if njit is not None else fn
+
+@_jit
+def _bigram_total(plain_idx, logp):
+    n = plain_idx.shape[0]
+    if n < 2:
+        return -9999.0
+    score = 0.0
+    for i in range(n - 1):
+        score += logp[plain_idx[i], plain_idx[i + 1]]
+    return score
+
+@_jit
+def _crib_hits(plain_idx, slot_pos, slot_target, slot_start):
+    hits = 0
+    for k in range(slot_start.shape[0] - 1):
+        hit = True
+        for j in range(slot_start[k], slot_start[k + 1]):
+            if plain_idx[slot_pos[j]] != slot_target[j]:
+                hit = False
+                break
+        if hit:
+            hits += 1
+    return hits
+
+# True if cur_map gives the same plaintext as one of the seen maps. Each row
+# of seen is a map with -1 for cipher letters absent from the ciphertext, so
+# equal rows on the remaining letters mean identical plaintexts.
+@_jit
+def _seen_before(seen, cur_map):
+    for r in range(seen.shape[0]):
+        same = True
+        for c in range(26):
+            if seen[r, c] >= 0 and seen[r, c] != cur_map[c]:
+                same = False
+                break
+        if same:
+            return True
+    return False
+
+@_jit
+def _sa_core(cipher_idx, logp, slot_pos, slot_target, slot_start, init_map,
+             start_temp, end_temp, steps, seed, patience, seen, check_every):
+    random.seed(seed)
+    n = cipher_idx.shape[0]
 
-    best_key = key.copy()
-    best_plain = decrypt_with_key(cipher, best_key)
-    best_score = combined_fitness(best_plain)
+    # Inverted index: cipher letter c occurs at order[starts[c]:starts[c + 1]]
+    order = np.argsort(cipher_idx, kind='mergesort')
+    starts = np.zeros(27, dtype=np.int64)
+    for i in range(n):
+        starts[cipher_idx[i] + 1] += 1
+    for c in range(26):
+        starts[c + 1] += starts[c]
 
-    current_key = key.copy()
-    current_plain = decrypt_with_key(cipher, current_key)
-    current_score = best_score
+    # Cipher letters inside some crib slot; moves that leave all of them
+    # alone cannot change the crib bonus
+    crib_letters = np.zeros(26, dtype=np.bool_)
+    for j in range(slot_pos.shape[0]):
+        crib_letters[cipher_idx[slot_pos[j]]] = True
 
-    for i in range(steps):
-        t = i / float(steps)
+    cur_map = init_map.copy()
+    plain_idx = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        plain_idx[i] = cur_map[cipher_idx[i]]
+    current_crib = CRIB_WEIGHT * _crib_hits(plain_idx, slot_pos, slot_target, slot_start)
+    current_score = _bigram_total(plain_idx, logp) + current_crib
+
+    best_map = cur_map.copy()
+    best_score = current_score
+
+    # One move is up to 3 (cipher letter, new plain letter) assignments,
+    # applied in order and undone in reverse
+    mv_c = np.empty(3, dtype=np.int64)
+    mv_p = np.empty(3, dtype=np.int64)
+    old_p = np.empty(3, dtype=np.int64)
+    mask = np.zeros(n, dtype=np.bool_)
+    touched = np.empty(n, dtype=np.int64)
+    since_improve = 0
+
+    for step in range(steps):
+        # Give up on a restart whose best has plateaued (patience <= 0: never)
+        if 0 < patience < since_improve:
+            break
+        since_improve += 1
+        # ...or whose best is a plaintext an earlier restart already reached
+        if (check_every > 0 and step > 0 and step % check_every == 0
+                and _seen_before(seen, best_map)):
+            break
+        t = step / steps
         temp = start_temp * (1 - t) + end_temp * t
-        candidate_key = mutate_fn(current_key)
-        candidate_plain = decrypt_with_key(cipher, candidate_key)
-        candidate_score = combined_fitness(candidate_plain)
-        delta = candidate_score - current_score
-        if delta > 0 or math.exp(delta / max(temp, 1e-12)) > random.random():
-            current_key = candidate_key
-            current_plain = candidate_plain
-            current_score = candidate_score
+
+        # Guided mutation: mostly a swap of two distinct letters, sometimes
+        # a 3-cycle. Drawing b (and c) from the remaining letters directly
+        # never wastes a step on a no-op and keeps the key a permutation.
+        a = random.randrange(26)
+        b = random.randrange(25)
+        if b >= a:
+            b += 1
+        mv_c[0], mv_p[0] = a, cur_map[b]
+        mv_c[1], mv_p[1] = b, cur_map[a]
+        m = 2
+        if random.random() < 0.06:
+            c = random.randrange(24)
+            if c >= min(a, b):
+                c += 1
+            if c >= max(a, b):
+                c += 1
+            mv_p[0] = cur_map[c]
+            mv_c[2], mv_p[2] = c, cur_map[b]
+            m = 3
+
+        # Delta scoring: only the bigrams around the remapped letters change
+        nt = 0
+        crib_touched = False
+        for k in range(m):
+            c = mv_c[k]
+            crib_touched = crib_touched or crib_letters[c]
+            for j in range(starts[c], starts[c + 1]):
+                p = order[j]
+                if p > 0 and not mask[p - 1]:
+                    mask[p - 1] = True
+                    touched[nt] = p - 1
+                    nt += 1
+                if p < n - 1 and not mask[p]:
+                    mask[p] = True
+                    touched[nt] = p
+                    nt += 1
+        delta = 0.0
+        for k in range(nt):
+            p = touched[k]
+            delta -= logp[plain_idx[p], plain_idx[p + 1]]
+        for k in range(m):
+            c = mv_c[k]
+            old_p[k] = cur_map[c]
+            cur_map[c] = mv_p[k]
+            for j in range(starts[c], starts[c + 1]):
+                plain_idx[order[j]] = mv_p[k]
+        for k in range(nt):
+            p = touched[k]
+            delta += logp[plain_idx[p], plain_idx[p + 1]]
+            mask[p] = False
+        candidate_crib = current_crib
+        if crib_touched:
+            candidate_crib = CRIB_WEIGHT * _crib_hits(plain_idx, slot_pos, slot_target, slot_start)
+            delta += candidate_crib - current_crib
+
+        # Metropolis test in log space: exp(delta / T) > U  <=>  delta > T * log(U),
+        # with U drawn from (0, 1] so the log is always defined
+        if delta > 0 or delta > max(temp, 1e-12) * math.log(1.0 - random.random()):
+            current_score += delta
+            current_crib = candidate_crib
             if current_score > best_score:
                 best_score = current_score
-                best_key = current_key.copy()
-                best_plain = current_plain
-    return best_key, best_score, best_plain
-
-# Run multiple restarts
-def run_restarts(cipher, restarts=60, steps=4000, top_n=6):
-    results = []
-    for r in range(restarts):
-        k0 = random_key()
-        key, score, plain = simulated_anneal(cipher, initial_key=k0, steps=steps)
-        results.append((score, plain, key))
+                best_map[:] = cur_map
+                since_improve = 0
+        else:
+            for k in range(m - 1, -1, -1):
+                c = mv_c[k]
+                cur_map[c] = old_p[k]
+                for j in range(starts[c], starts[c + 1]):
+                    plain_idx[order[j]] = old_p[k]
+
+    # Rescore the winner exactly rather than report the running sum
+    for i in range(n):
+        plain_idx[i] = best_map[cipher_idx[i]]
+    best_score = (_bigram_total(plain_idx, logp)
+                  + CRIB_WEIGHT * _crib_hits(plain_idx, slot_pos, slot_target, slot_start))
+    return best_map, best_score
+
+# Everything the core needs from a ciphertext, built once and reused for
+# every restart: (letter indices, crib slot positions, targets, offsets)
+def prepare_cipher(cipher):
+    return (_letters_to_idx(cipher).astype(np.int64),) + crib_slots(cipher)
+
+# seen: optional set of solutions from earlier restarts (updated in place),
+# each the key's bytes with 255 for letters the ciphertext lacks; the anneal
+# stops early, checking every check_every steps, once its best plaintext is
+# one of them
+def simulated_anneal(cipher, initial_key=None, start_temp=1.0, end_temp=0.001, steps=4000,
+                     seed=None, prepared=None, patience=1500, seen=None, check_every=500):
+    if initial_key is None:
+        key = random_key()
+    else:
+        key = bytes(initial_key)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if prepared is None:
+        prepared = prepare_cipher(cipher)
+
+    cipher_idx, slot_pos, slot_target, slot_start = prepared
+    init_map = np.frombuffer(key, dtype=np.uint8).astype(np.int64)
+    used = np.bincount(cipher_idx, minlength=26) > 0
+    seen_arr = np.array([np.frombuffer(k, dtype=np.int8) for k in seen or ()],
+                        dtype=np.int64).reshape(-1, 26)
+    args = (cipher_idx, LOGP, slot_pos, slot_target, slot_start, init_map, float(start_temp),
+            float(end_temp), int(steps), seed, int(patience), seen_arr, int(check_every))
+    if njit is None:
+        # The plain-Python core seeds the global random module (numba keeps its
+        # own generator), so put the caller's random state back afterwards
+        state = random.getstate()
+        try:
+            best_map, best_score = _sa_core(*args)
+        finally:
+            random.setstate(state)
+    else:
+        best_map, best_score = _sa_core(*args)
+    if seen is not None:
+        seen.add(np.where(used, best_map, -1).astype(np.int8).tobytes())
+
+    best_key = best_map.astype(np.uint8).tobytes()
+    return best_key, best_score, decrypt_with_key(cipher, best_key)
+
+def _restart(cipher, prepared, seen, steps, patience, seed):
+    k0 = random_key(random.Random(seed))
+    key, score, plain = simulated_anneal(cipher, initial_key=k0, steps=steps, seed=seed,
+                                         prepared=prepared, patience=patience, seen=seen)
+    return score, plain, key
+
+# Restarts per task. A restart only stops early on solutions found earlier in
+# its own group, so results depend on the seeds alone and not on the number
+# of workers or on which worker runs which group.
+RESTART_GROUP = 4
+# Fewest groups worth a process pool; with less work than this the pool's
+# start-up costs more than the restarts it would spread out
+MIN_PARALLEL_GROUPS = 4
+
+# Per-worker copy of the ciphertext and its prepared arrays, set once by the
+# Pool initializer so tasks only carry their seeds
+_WORKER_STATE = ()
+
+def _init_worker(cipher, prepared):
+    global _WORKER_STATE
+    _WORKER_STATE = (cipher, prepared)
+
+def _restart_group(cipher, prepared, steps, patience, seeds):
+    seen = set()
+    return [_restart(cipher, prepared, seen, steps, patience, seed) for seed in seeds]
+
+def _one_group(steps, patience, seeds):
+    return _restart_group(*_WORKER_STATE, steps, patience, seeds)
+
+# Compile (or load from numba's cache) every jitted function the core calls,
+# so forked workers inherit ready dispatchers instead of each compiling them
+def _warm_up(cipher, prepared):
+    if njit is not None:
+        simulated_anneal(cipher, initial_key=bytes(range(26)), steps=1, seed=0,
+                         prepared=prepared, seen=set())
+
+# Run multiple restarts, spread across worker processes (never more than
+# there are CPUs; serially when there is too little work for a pool)
+def run_restarts(cipher, restarts=60, steps=4000, top_n=6, workers=None, patience=1500):
+    cpus = os.cpu_count() or 1
+    workers = cpus if workers is None else min(workers, cpus)
+    seeds = [random.randrange(2 ** 32) for _ in range(restarts)]
+    groups = [seeds[i:i + RESTART_GROUP] for i in range(0, restarts, RESTART_GROUP)]
+    workers = min(workers, len(groups))
+    prepared = prepare_cipher(cipher)
+    if workers > 1 and len(groups) >= MIN_PARALLEL_GROUPS:
+        _warm_up(cipher, prepared)
+        # fork (where available) hands the initializer arguments to the
+        # children in inherited memory instead of pickling them
+        if 'fork' in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context('fork')
+        else:
+            ctx = multiprocessing.get_context()
+        with ctx.Pool(workers, initializer=_init_worker,
+                      initargs=(cipher, prepared)) as pool:
+            job = functools.partial(_one_group, steps, patience)
+            grouped = pool.map(job, groups)
+    else:
+        grouped = [_restart_group(cipher, prepared, steps, patience, g) for g in groups]
+    results = [r for group in grouped for r in group]
 
     results.sort(reverse=True, key=lambda x: x[0])
     seen = set()
@@ -1,10 +1,14 @@
 def create_decryption_table(key_mapping):
-    """Creates the decryption translation table."""
-    return str.maketrans(key_mapping)
+    """Creates the decryption translation table (a 256-byte lookup table)."""
+    table = bytearray(range(256))
+    for cipher_letter, plain_letter in key_mapping.items():
+        table[ord(cipher_letter)] = ord(plain_letter)
+    return bytes(table)
 
 def aristocrat_decipher(ciphertext, table):
     """Applies the cipher translation (decryption) to the ciphertext."""
-    return ciphertext.upper().translate(table)
+    # UTF-8 bytes >= 0x80 map to themselves, so non-ASCII text like ’ passes through
+    return ciphertext.upper().encode("utf-8").translate(table).decode("utf-8")
 
 # The Full Decryption Key (Ciphertext letter -> Plaintext letter)
 DECRYPTION_KEY = {
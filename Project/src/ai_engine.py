@@ -8,76 +8,574 @@ document and similarity-based search is required.
 
 Key features:
 - Index a list of documents (each a dictionary with 'id' and 'text')
-- Cache embeddings to disk for faster subsequent loads
-- Query documents based on cosine similarity with a text input
-- Supports top-k retrieval of most relevant documents
+- Cache embeddings to disk (.npy plus a JSON sidecar) and memory-map them on load;
+  the cache is keyed by a fingerprint of the model, tokenizer and document texts
+- Keep recent query embeddings in an LRU cache so repeated queries skip the model
+- Query documents based on cosine similarity with a text input; embeddings are
+  L2-normalized once at index time so a query is a single matrix-vector product
+- Batched, model-side normalized encoding of the corpus, optionally spread over a
+  pool of worker processes for large corpora
+- Optional float16 or int8 (per-row scale) storage for a 2x/4x smaller index
+- Supports top-k retrieval of most relevant documents, optionally through a FAISS
+  HNSW graph (ann=True) instead of a scan over every embedding
+- SentenceTransformer models are loaded once per (name, device) and shared by engines;
+  AIENGINE_TORCH_THREADS, when set, fixes torch's CPU thread count before loading
+- Optional ONNX Runtime backend (backend="onnx") running an int8-quantized ONNX
+  export matched to the CPU (the model repo's own, or one made once under
+  data/onnx); falls back to torch when optimum is missing or the load fails
+- get_engine(): a process-wide engine indexed over the recipe dataset, so the model
+  is loaded and the corpus indexed once rather than on every use
 
 Dependencies:
-- sentence_transformers: for computing embeddings and cosine similarity
-- numpy: for handling vector operations
-- pickle: for caching embeddings
+- sentence_transformers: for computing embeddings; imported when the first model is
+  loaded, so importing this module does not pay for torch
+- numpy: for normalization and the similarity matmul
+- json, hashlib, functools: for the cache sidecar, its fingerprint and the query LRU
 - pathlib: for handling file paths
+- data_loader: to load the recipe dataset for get_engine()
+- numba (optional): a parallel int8 dot-product kernel; without it the int8 scan
+  falls back to a numpy int32 matmul
+- faiss (optional): approximate nearest-neighbour search for ann=True; without it
+  queries use the exact scan
+- optimum[onnxruntime] (optional): the backend="onnx" encoder
 """
 from __future__ import annotations
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Optional, Tuple
+from collections.abc import Sequence
+import functools
+import hashlib
+import importlib.util
+import json
+import os
 import pathlib
-import pickle
+import platform
 import numpy as np
 
-from sentence_transformers import SentenceTransformer, util
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
-EMBED_CACHE = pathlib.Path(__file__).resolve().parents[1] / "data" / "embeddings.pkl"
+try:
+    import faiss
+except ImportError:
+    faiss = None
 
-class AIEngine:
+from src.data_loader import load_better_recipes, recipes_to_docs
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+EMBED_CACHE = pathlib.Path(__file__).resolve().parents[1] / "data" / "embeddings.npy"
+# Bump when the way stored embeddings are produced changes (e.g. normalization)
+CACHE_VERSION = 1
+QUERY_CACHE_SIZE = 1024
+# HNSW graph degree and search breadth for ann=True
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+# Smallest corpus for which index(num_workers=N) starts a multi-process pool
+MULTI_PROCESS_MIN_DOCS = 1000
+# An indexed document: string fields plus e.g. a float (or None) 'rating'
+Doc = Dict[str, Any]
+# Placeholder in AIEngine.columns for a field a document does not have
+_MISSING = object()
+
+# Environment variable holding the torch intra-op thread count for CPU encoding
+TORCH_THREADS_ENV = "AIENGINE_TORCH_THREADS"
+# Local int8 ONNX exports for backend="onnx" when the model repo ships none for this CPU
+ONNX_CACHE = EMBED_CACHE.parent / "onnx"
+# (quantization config, CPU flag it needs), best first, for x86 CPUs
+_X86_QUANTIZATION_CONFIGS = (("avx512_vnni", "avx512_vnni"), ("avx512", "avx512f"),
+                             ("avx2", "avx2"))
+
+# sentence_transformers.SentenceTransformer, bound by _import_st() on first model load
+SentenceTransformer = None  # pylint: disable=invalid-name
+
+_MODEL_CACHE: Dict[Tuple[str, Optional[str], str], SentenceTransformer] = {}
+
+
+def _configure_torch_threads() -> None:
+    """Apply `TORCH_THREADS_ENV` to torch's CPU thread pool, if it is set and torch imports."""
+    value = os.environ.get(TORCH_THREADS_ENV)
+    if value is None:
+        return
+    try:
+        threads = int(value)
+    except ValueError:
+        threads = 0
+    if threads < 1:
+        print(f"Ignoring {TORCH_THREADS_ENV}={value!r}: expected a positive integer")
+        return
+    try:
+        import torch  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def _import_st():
+    """Return the SentenceTransformer class, importing sentence_transformers on first use."""
+    global SentenceTransformer  # pylint: disable=global-statement
+    if SentenceTransformer is None:
+        from sentence_transformers import (  # pylint: disable=import-outside-toplevel
+            SentenceTransformer as model_class)
+        SentenceTransformer = model_class
+    return SentenceTransformer
+
+
+def _onnx_available() -> bool:
+    """Return True when optimum and onnxruntime are importable."""
+    return all(importlib.util.find_spec(name) is not None for name in ("optimum", "onnxruntime"))
+
+
+def _cpu_flags() -> set:
+    """Return the CPU feature flags listed in /proc/cpuinfo (empty when unreadable)."""
+    try:
+        return set(pathlib.Path("/proc/cpuinfo").read_text(encoding="utf-8").split())
+    except OSError:
+        return set()
+
+
+def _cpu_quantization_config() -> Optional[str]:
+    """Return the ONNX dynamic-quantization config for this CPU, or None if none fits."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    flags = _cpu_flags()
+    for config, flag in _X86_QUANTIZATION_CONFIGS:
+        if flag in flags:
+            return config
+    return None
+
+
+def _export_quantized_onnx(model_name: str, config: str, export_dir: pathlib.Path) -> None:
+    """Export `model_name` to ONNX in `export_dir` and add its int8 `config` quantization."""
+    from sentence_transformers import (  # pylint: disable=import-outside-toplevel
+        export_dynamic_quantized_onnx_model)
+    model = _import_st()(model_name, backend="onnx")
+    model.save(str(export_dir))
+    export_dynamic_quantized_onnx_model(model, config, str(export_dir),
+                                        file_suffix=f"qint8_{config}")
+
+
+def _load_onnx_model(model_name: str, device: Optional[str] = None) -> SentenceTransformer:
+    """
+    Load `model_name` for ONNX Runtime with the int8 export for this CPU.
+
+    The model repo's prebuilt `onnx/model_qint8_<config>.onnx` is used when it has one;
+    otherwise the model is exported and quantized once into `ONNX_CACHE`. CPUs with no
+    matching config get the plain (float) ONNX export.
+    """
+    model_class = _import_st()
+    config = _cpu_quantization_config()
+    if config is None:
+        return model_class(model_name, device=device, backend="onnx")
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    export_dir = ONNX_CACHE / model_name.replace("/", "--")
+    if not (export_dir / file_name).exists():
+        try:
+            return model_class(model_name, device=device, backend="onnx",
+                               model_kwargs={"file_name": file_name})
+        except Exception:  # pylint: disable=broad-exception-caught
+            # the repo has no such file (the hub and local loaders raise different errors)
+            _export_quantized_onnx(model_name, config, export_dir)
+    return model_class(str(export_dir), device=device, backend="onnx",
+                       model_kwargs={"file_name": file_name})
+
+
+def _get_model(model_name: str, device: Optional[str] = None,
+               backend: str = "torch") -> SentenceTransformer:
+    """Return the shared SentenceTransformer for `model_name` on `device`, loading it once."""
+    key = (model_name, device, backend)
+    model = _MODEL_CACHE.get(key)
+    if model is None:
+        _configure_torch_threads()
+        if backend == "onnx":
+            model = _load_onnx_model(model_name, device)
+        else:
+            model = _import_st()(model_name, device=device)
+        _MODEL_CACHE[key] = model
+    return model
+
+
+def _cache_paths(cache: pathlib.Path) -> Tuple[pathlib.Path, pathlib.Path, pathlib.Path]:
+    """Return the metadata, int8-scale and HNSW-index sidecar paths for a cache file."""
+    return (cache.with_suffix(".json"), cache.with_name(cache.stem + ".scales.npy"),
+            cache.with_suffix(".hnsw"))
+
+
+def _atomic_write(path: pathlib.Path, write) -> None:
+    """Write `path` via `write(file)` on a temp file, then swap it in with `os.replace`."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _quantize_rows(emb: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantize rows of `emb` to int8, returning the codes and each row's float32 scale."""
+    emb = np.atleast_2d(emb)
+    scale = 127.0 / np.max(np.abs(emb), axis=1, keepdims=True).clip(min=1e-9)
+    codes = np.round(emb * scale).astype(np.int8)
+    return codes, scale.reshape(-1).astype(np.float32)
+
+
+def _upcast_dots(emb: np.ndarray, q_emb: np.ndarray, chunk_rows: int = 8192,
+                 out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Return `emb @ q_emb` in float32 for float16 `emb`, upcasting one block at a time."""
+    if out is None:
+        out = np.empty(emb.shape[:1] + q_emb.shape[1:], dtype=np.float32)
+    for start in range(0, emb.shape[0], chunk_rows):
+        block = emb[start:start + chunk_rows].astype(np.float32)
+        np.matmul(block, q_emb, out=out[start:start + chunk_rows])
+    return out
+
+
+def _int8_dots_numpy(codes: np.ndarray, q_codes: np.ndarray) -> np.ndarray:
+    """Return the int32 dot product of every int8 row of `codes` with `q_codes`."""
+    # accumulate in int32: 127 * 127 * dims overflows int16
+    return codes.astype(np.int32) @ q_codes.astype(np.int32)
+
+
+if njit is None:
+    _int8_dots = _int8_dots_numpy
+else:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _int8_scan(codes, q_codes, out):
+        for i in prange(codes.shape[0]):  # pylint: disable=not-an-iterable
+            acc = 0
+            for j in range(codes.shape[1]):
+                acc += np.int32(codes[i, j]) * np.int32(q_codes[j])
+            out[i] = acc
+
+    def _int8_dots(codes: np.ndarray, q_codes: np.ndarray) -> np.ndarray:
+        """Numba version of `_int8_dots_numpy`, without the int32 copy of `codes`."""
+        out = np.empty(codes.shape[0], dtype=np.int32)
+        _int8_scan(np.asarray(codes), q_codes, out)
+        return out
+
+
+class DocsView(Sequence):
+    """
+    Read-only list-like view of an engine's documents.
+
+    Indexing builds just the requested dict(s) from `AIEngine.columns`, so `view[i]` is
+    O(1). The dicts are fresh copies: editing one does not change the engine; assign a new
+    list to `AIEngine.docs` instead.
+    """
+
+    def __init__(self, engine: "AIEngine"):
+        self._engine = engine
+
+    def __len__(self) -> int:
+        return self._engine.n_docs
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._engine.doc(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        return self._engine.doc(i)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"DocsView({list(self)!r})"
+
+
+class AIEngine:  # pylint: disable=too-many-instance-attributes
     """
     AIEngine indexes and searches textual documents using sentence embeddings.
 
     Attributes:
         model_name (str): Name of the SentenceTransformer model to use for embeddings.
         model (SentenceTransformer): The instantiated sentence transformer model.
-        docs (List[Dict[str, str]]): List of indexed documents.
-        embeddings (Optional[np.ndarray]): Embedding vectors corresponding to `docs`.
+        docs (DocsView): Read-only view of the indexed documents. Stored internally as
+            one list per field (`columns`); each access to `docs[i]` (or `doc(i)`)
+            builds a fresh dict. Assign a list to replace the documents.
+        columns (Dict[str, list]): Field name -> per-document values, `_MISSING` where a
+            document lacks that field.
+        precision (str): "float32" (default), "float16" or "int8" storage for the embeddings.
+        batch_size (int): Number of texts encoded per model forward pass.
+        embeddings (Optional[np.ndarray]): L2-normalized embedding vectors corresponding
+            to `docs`, one row per document; int8 codes when precision is "int8". A
+            read-only np.memmap when loaded from the cache: copy before mutating.
+        scales (Optional[np.ndarray]): Per-row int8 scales (None for float32).
+        ann (bool): Whether to search a FAISS HNSW index rather than scan all rows.
+        ann_index (Optional[faiss.Index]): The HNSW index, or None when ann is off,
+            faiss is not installed, or precision is "int8".
 
     Methods:
-        index(docs, force_recompute=False):
+        index(docs, force_recompute=False, num_workers=0):
             Compute and cache embeddings for a list of documents.
         query(text, top_k=5):
             Return the top_k most similar documents to the input text.
     """
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    PRECISIONS = ("float32", "float16", "int8")
+    BACKENDS = ("torch", "onnx")
+
+    def __init__(self, model_name: str = DEFAULT_MODEL,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 precision: str = "float32", batch_size: int = 256,
+                 device: Optional[str] = None, ann: bool = False, backend: str = "torch"):
+        """
+        Load the embedding model.
+
+        `device` is passed to SentenceTransformer; the default (None) lets it pick
+        CUDA when available and fall back to the CPU otherwise. Engines with the same
+        model name and device share one loaded model. `ann=True` answers
+        queries from an HNSW graph when faiss is installed and precision is float.
+        `backend="onnx"` encodes with ONNX Runtime and an int8 export for this CPU
+        (see `_load_onnx_model`), or with torch when optimum is not installed or the
+        ONNX model cannot be loaded.
+        """
+        if precision not in self.PRECISIONS:
+            raise ValueError(f"precision must be one of {self.PRECISIONS}, got {precision!r}")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"backend must be one of {self.BACKENDS}, got {backend!r}")
+        self.model = None
+        if backend == "onnx" and not _onnx_available():
+            print("optimum[onnxruntime] is not installed; using the torch backend")
+        elif backend == "onnx":
+            try:
+                self.model = _get_model(model_name, device, "onnx")
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"Failed to load the ONNX model: {e}; using the torch backend")
+        if self.model is None:
+            backend = "torch"
+            self.model = _get_model(model_name, device)
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
-        self.docs: List[Dict[str, str]] = []
+        self.precision = precision
+        self.batch_size = batch_size
+        self.backend = backend
+        self.columns: Dict[str, list] = {}
+        self.n_docs = 0
         self.embeddings: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.ann = ann
+        self.ann_index = None
+        self._scores_buf: Optional[np.ndarray] = None
+        self._embed_query = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._encode_query)
+
+    @property
+    def docs(self) -> DocsView:
+        """The indexed documents, as a read-only view over `columns`."""
+        return DocsView(self)
+
+    @docs.setter
+    def docs(self, docs: List[Doc]) -> None:
+        fields = list(dict.fromkeys(key for d in docs for key in d))
+        self.columns = {key: [d.get(key, _MISSING) for d in docs] for key in fields}
+        self.n_docs = len(docs)
+
+    def doc(self, i: int) -> Doc:
+        """Return document `i` as a dict (only the fields it was indexed with)."""
+        return {key: col[i] for key, col in self.columns.items() if col[i] is not _MISSING}
+
+    def fingerprint(self, docs: List[Doc]) -> str:
+        """Return a sha256 over the model, backend, tokenizer, cache version and doc texts."""
+        h = hashlib.sha256()
+        tokenizer = type(getattr(self.model, "tokenizer", None)).__name__
+        h.update(f"{self.model_name}|{self.backend}|{tokenizer}|{CACHE_VERSION}|"
+                 .encode("utf-8"))
+        for d in docs:
+            h.update(d["text"].encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _ann_enabled(self) -> bool:
+        """Return True when queries should go through an HNSW index."""
+        return self.ann and faiss is not None and self.precision != "int8"
 
-    def index(self, docs: List[Dict[str, str]], force_recompute: bool = False) -> None:
-        """Index documents (list of dicts with 'id' and 'text'). Caches embeddings to disk."""
+    def _build_ann_index(self):
+        """Build an inner-product HNSW graph over the (unit-length) embeddings."""
+        vectors = np.ascontiguousarray(self.embeddings, dtype=np.float32)
+        ann_index = faiss.IndexHNSWFlat(vectors.shape[1], HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        ann_index.hnsw.efSearch = HNSW_EF_SEARCH
+        ann_index.add(vectors)  # pylint: disable=no-value-for-parameter
+        return ann_index
+
+    def _encode_corpus(self, texts: List[str], num_workers: int) -> np.ndarray:
+        """Encode `texts` to unit-length float32 rows, with a CPU worker pool if asked."""
+        if num_workers > 0 and len(texts) >= MULTI_PROCESS_MIN_DOCS:
+            pool = self.model.start_multi_process_pool(["cpu"] * num_workers)
+            try:
+                emb = self.model.encode_multi_process(texts, pool, batch_size=self.batch_size)
+            finally:
+                self.model.stop_multi_process_pool(pool)
+            emb = np.array(emb, dtype=np.float32, order="C", ndmin=2)
+            emb /= np.linalg.norm(emb, axis=1, keepdims=True).clip(min=1e-12)
+            return emb
+        emb = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                normalize_embeddings=True, show_progress_bar=True)
+        return np.array(emb, dtype=np.float32, order="C", ndmin=2)
+
+    def index(self, docs: List[Doc], force_recompute: bool = False,
+              num_workers: int = 0) -> None:
+        """
+        Index documents (list of dicts with 'id' and 'text'). Caches embeddings to disk.
+
+        With `num_workers > 0` and at least `MULTI_PROCESS_MIN_DOCS` documents, encoding
+        is split across that many CPU worker processes.
+
+        The embedding matrix is written to `EMBED_CACHE` with `np.save` and described by a
+        JSON sidecar (model, precision, doc ids and `fingerprint`). A cache whose sidecar
+        matches is memory-mapped read-only instead of being loaded into memory, so
+        processes sharing the cache share its pages. Rewrites (e.g. `force_recompute`)
+        go through a temp file and `os.replace`, which leaves engines still mapping the
+        old file untouched; the sidecar is replaced last. A fresh encode (cache miss or
+        `force_recompute`) keeps its regular in-memory array rather than re-mapping the
+        file it just wrote. With `ann` enabled the HNSW index is saved next to the cache
+        and read back on a hit.
+        """
         self.docs = docs
+        meta_path, scales_path, ann_path = _cache_paths(EMBED_CACHE)
+        ids = [str(d["id"]) for d in docs]
+        fingerprint = self.fingerprint(docs)
         if EMBED_CACHE.exists() and not force_recompute:
             try:
-                with open(EMBED_CACHE, "rb") as f:
-                    data = pickle.load(f)
-                if data.get("model") == self.model_name and len(data.get("docs", [])) == len(docs):
-                    self.embeddings = data["embeddings"]
-                    # quick sanity: doc ids match?
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                if (meta.get("model") == self.model_name
+                        and meta.get("precision") == self.precision
+                        and meta.get("ids") == ids
+                        and meta.get("fingerprint") == fingerprint):
+                    self.embeddings = np.load(EMBED_CACHE, mmap_mode="r")
+                    self.scales = np.load(scales_path) if self.precision == "int8" else None
+                    self.ann_index = None
+                    if self._ann_enabled():
+                        self.ann_index = (faiss.read_index(str(ann_path)) if meta.get("ann")
+                                          else self._build_ann_index())
                     return
-            except (FileNotFoundError, OSError, pickle.UnpicklingError, EOFError) as e:
+            except (OSError, ValueError, EOFError, RuntimeError) as e:
                 print(f"Failed to load cached embeddings: {e}")
 
-        texts = [d["text"] for d in docs]
-        self.embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        with open(EMBED_CACHE, "wb") as f:
-            pickle.dump({"model": self.model_name, "docs": docs, "embeddings": self.embeddings}, f)
+        self.embeddings = self._encode_corpus([d["text"] for d in docs], num_workers)
+        self.scales = None
+        if self.precision == "int8":
+            self.embeddings, self.scales = _quantize_rows(self.embeddings)
+            _atomic_write(scales_path, lambda f: np.save(f, self.scales))
+        elif self.precision == "float16":
+            self.embeddings = self.embeddings.astype(np.float16)
+        _atomic_write(EMBED_CACHE, lambda f: np.save(f, self.embeddings))
+        self.ann_index = None
+        if self._ann_enabled():
+            self.ann_index = self._build_ann_index()
+            tmp = ann_path.with_name(ann_path.name + ".tmp")
+            faiss.write_index(self.ann_index, str(tmp))
+            os.replace(tmp, ann_path)
+        meta = {"model": self.model_name, "precision": self.precision, "n": len(docs),
+                "ids": ids, "fingerprint": fingerprint, "ann": self.ann_index is not None}
+        _atomic_write(meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
 
-    def query(self, text: str, top_k: int = 5) -> List[Tuple[Dict[str, str], float]]:
-        """Return top_k (doc, score) pairs using cosine similarity."""
-        if self.embeddings is None or not self.docs:
+    def _encode_query(self, text: str) -> np.ndarray:
+        """Encode and L2-normalize a query; results are shared via the LRU, so read-only."""
+        q_emb = np.array(self.model.encode(text, convert_to_numpy=True), dtype=np.float32)
+        q_emb = q_emb.reshape(-1)
+        q_emb /= max(float(np.linalg.norm(q_emb)), 1e-12)
+        q_emb.flags.writeable = False
+        return q_emb
+
+    def _scores(self) -> np.ndarray:
+        """Return the reusable float32 score buffer, one slot per indexed row."""
+        rows = self.embeddings.shape[0]
+        if self._scores_buf is None or self._scores_buf.shape[0] != rows:
+            self._scores_buf = np.empty(rows, dtype=np.float32)
+        return self._scores_buf
+
+    def query(self, text: str, top_k: int = 5) -> List[Tuple[Doc, float]]:
+        """
+        Return top_k (doc, score) pairs using cosine similarity.
+
+        Scores are written into a buffer reused across calls, so one engine should not
+        be queried from several threads at once.
+        """
+        if self.embeddings is None or not self.n_docs:
             raise RuntimeError("Engine has not been indexed with documents.")
-        q_emb = self.model.encode(text, convert_to_numpy=True)
-        scores = util.cos_sim(q_emb, self.embeddings)[0].cpu().numpy()  # shape (n_docs,)
-        # Get top indices
-        idx = np.argsort(-scores)[:top_k]
+        k = min(top_k, self.embeddings.shape[0])
+        if k <= 0:
+            return []
+        q_emb = self._embed_query(text)
+        if self.ann_index is not None:
+            sims, idx = self.ann_index.search(q_emb[None, :], k)
+            return [(self.doc(int(i)), float(sim)) for sim, i in zip(sims[0], idx[0]) if i >= 0]
+        # rows are unit length, so the dot product is the cosine similarity
+        scores = self._scores()
+        if self.precision == "int8":
+            q_codes, q_scale = _quantize_rows(q_emb)
+            dots = _int8_dots(self.embeddings, q_codes[0])
+            np.divide(dots, self.scales * q_scale[0], out=scores)
+        elif self.precision == "float16":
+            # BLAS has no float16 matvec; upcast in cache-sized blocks instead of
+            # letting numpy copy the whole matrix to float32
+            _upcast_dots(self.embeddings, q_emb, out=scores)
+        else:
+            np.matmul(self.embeddings, q_emb, out=scores)  # shape (n_docs,)
+        return self._top_k(scores, k)
+
+    def query_batch(self, queries: List[str],
+                    top_k: int = 5) -> List[List[Tuple[Doc, float]]]:
+        """
+        Return the top_k (doc, score) pairs for each of `queries`, in order.
+
+        All queries are encoded in one model call (`batch_size` texts per pass) and
+        scored against the corpus together: one matrix product for float embeddings,
+        one int8 kernel pass per query for int8. This is much cheaper than calling
+        `query` per text.
+        """
+        if self.embeddings is None or not self.n_docs:
+            raise RuntimeError("Engine has not been indexed with documents.")
+        k = min(top_k, self.embeddings.shape[0])
+        if k <= 0 or not queries:
+            return [[] for _ in queries]
+        q_embs = np.array(self.model.encode(queries, batch_size=self.batch_size,
+                                            convert_to_numpy=True,
+                                            normalize_embeddings=True),
+                          dtype=np.float32, order="C", ndmin=2)
+        if self.ann_index is not None:
+            sims, idx = self.ann_index.search(q_embs, k)
+            return [[(self.doc(int(i)), float(sim)) for sim, i in zip(row_sims, row_idx) if i >= 0]
+                    for row_sims, row_idx in zip(sims, idx)]
+        # scores has one row per query
+        if self.precision == "int8":
+            q_codes, q_scales = _quantize_rows(q_embs)
+            scores = np.empty((len(q_embs), self.embeddings.shape[0]), dtype=np.float32)
+            for row, codes, scale in zip(scores, q_codes, q_scales):
+                np.divide(_int8_dots(self.embeddings, codes), self.scales * scale, out=row)
+        elif self.precision == "float16":
+            scores = _upcast_dots(self.embeddings, q_embs.T).T
+        else:
+            scores = q_embs @ self.embeddings.T
+        return [self._top_k(row, k) for row in scores]
+
+    def _top_k(self, scores: np.ndarray, k: int) -> List[Tuple[Doc, float]]:
+        """Return the k best (doc, score) pairs for one row of scores, best first."""
+        # Get top indices: partial selection of the k best, then sort just those
+        part = np.argpartition(scores, -k)[-k:]
+        idx = part[np.argsort(-scores[part])]
         results = []
         for i in idx:
-            results.append((self.docs[int(i)], float(scores[int(i)])))
+            results.append((self.doc(int(i)), float(scores[int(i)])))
         return results
+
+
+_ENGINES: Dict[str, AIEngine] = {}
+
+
+def get_engine(model_name: str = DEFAULT_MODEL, force_recompute: bool = False) -> AIEngine:
+    """
+    Return the shared AIEngine for `model_name`, indexed over the recipe dataset.
+
+    The first call loads the model and indexes `recipes_to_docs(load_better_recipes())`;
+    later calls return the same engine. `force_recompute=True` re-reads the dataset and
+    re-encodes it with the already-loaded model, ignoring the on-disk cache.
+    """
+    engine = _ENGINES.get(model_name)
+    if engine is None or force_recompute:
+        if engine is None:
+            engine = AIEngine(model_name)
+        engine.index(recipes_to_docs(load_better_recipes()), force_recompute=force_recompute)
+        _ENGINES[model_name] = engine
+    return engine
@@ -9,14 +9,12 @@ similarity search, and NLP utilities to extract keywords from user queries.
 
 Main functionality:
 - Parse command-line arguments for query text, number of results, and force recompute.
-- Load and preprocess recipe data from the dataset.
-- Index recipes using AIEngine, with optional caching of embeddings.
+- Get the shared, recipe-indexed AIEngine (cached embeddings unless recomputing).
 - Extract keywords from the query for display purposes.
 - Perform similarity-based search and display top-k recipes with details.
 
 Dependencies:
-- data_loader: to load and preprocess the recipe dataset
-- ai_engine: to index recipes and perform similarity queries
+- ai_engine: to load the indexed recipes and perform similarity queries
 - nlp_utils: to extract keywords from the search query
 - argparse: for command-line argument parsing
 
@@ -31,8 +29,8 @@ Optional flags:
 """
 from __future__ import annotations
 import argparse
-from src.data_loader import load_better_recipes, recipes_to_docs
-from src.ai_engine import AIEngine
+import sys
+from src.ai_engine import get_engine
 from src.nlp_utils import extract_keywords
 
 def run_cli():
@@ -42,13 +40,12 @@ def run_cli():
     This function handles the full workflow of the CLI:
     1. Parses command-line arguments for a search query, number of top results, 
        and optional recompute flag.
-    2. Loads and preprocesses the recipe dataset using `load_better_recipes` and 
-       `recipes_to_docs`.
-    3. Initializes the AIEngine and indexes the recipes (embeddings are cached 
-       for efficiency, unless `--recompute` is specified).
-    4. Extracts keywords from the user query for display using `extract_keywords`.
-    5. Queries the AIEngine for the top-k most similar recipes.
-    6. Prints the keywords, recipe titles, ingredients, cuisine, and similarity scores.
+    2. Gets the recipe-indexed AIEngine from `get_engine`, which loads the dataset
+       and model once per process (embeddings are cached for efficiency, unless
+       `--recompute` is specified).
+    3. Extracts keywords from the user query for display using `extract_keywords`.
+    4. Queries the AIEngine for the top-k most similar recipes.
+    5. Prints the keywords, recipe titles, ingredients, cuisine, and similarity scores.
 
     Command-Line Arguments:
         --query, -q : str
@@ -73,22 +70,20 @@ def run_cli():
     p.add_argument("--recompute", action="store_true", help="Force recompute embeddings")
     args = p.parse_args()
 
-    df = load_better_recipes()
-    docs = recipes_to_docs(df)
-    engine = AIEngine()
-    engine.index(docs, force_recompute=args.recompute)
+    engine = get_engine(force_recompute=args.recompute)
 
     # small pre-processing + show keywords
     keywords = extract_keywords(args.query, top_k=8)
     print(f"Query keywords: {', '.join(keywords)}\n")
 
     results = engine.query(args.query, top_k=args.topk)
-    print("Top recipes:")
+    # build the whole report and write it once instead of four print() calls per recipe
+    lines = ["Top recipes:"]
     for doc, score in results:
-        print(f"- [{doc['id']}] {doc['title']} (score: {score:.3f})")
-        print(f"  Ingredients: {doc['ingredients']}")
-        print(f"  Cuisine: {doc.get('cuisine','')}")
-        print()
+        lines.append(f"- [{doc['id']}] {doc['title']} (score: {score:.3f})\n"
+                     f"  Ingredients: {doc['ingredients']}\n"
+                     f"  Cuisine: {doc.get('cuisine','')}\n")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     run_cli()
@@ -13,14 +13,16 @@ Main Functions:
     Loads the CSV dataset, parses nested columns, and creates combined text fields
     for each recipe. Returns a cleaned pandas DataFrame.
 
-- recipes_to_docs(df: pd.DataFrame) -> List[Dict[str, str]]
+- recipes_to_docs(df: pd.DataFrame) -> List[Dict[str, Any]]
     Converts a DataFrame of recipes into a list of dictionaries suitable for 
     embedding and similarity searches. Each dictionary includes fields like 'id',
     'title', 'ingredients', 'directions', 'cuisine', 'rating', 'text', and 'url'.
+    'rating' is a float (None when missing); the other fields are strings.
 
 Dependencies:
 - pandas: for DataFrame manipulation
 - pathlib: for filesystem paths
+- json: fast (C) parsing of list/dict columns that are valid JSON
 - ast: for safe evaluation of string representations of Python lists/dicts
 
 df = load_better_recipes("data/recipes.csv")
@@ -30,22 +32,52 @@ print(docs[0]["title"], docs[0]["text"])
 from __future__ import annotations
 import pathlib
 import ast
+import copy
+import functools
+import json
 from typing import List, Dict, Any
 import pandas as pd
 
 DATA_DIR = pathlib.Path(__file__).resolve().parents[1] / "data"
 
 
+# First characters of the literals worth handing to ast.literal_eval
+_LITERAL_STARTS = ("[", "{", "'", '"')
+
+
+@functools.lru_cache(maxsize=8192)
+def _literal_eval_cached(value: str) -> Any:
+    """`ast.literal_eval(value)`, or `value` itself if it is not a literal (memoized)."""
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
 def _safe_eval(value: Any) -> Any:
-    """Safely evaluate string representations of Python literals (lists/dicts)."""
-    if isinstance(value, str):
-        try:
-            return ast.literal_eval(value)
-        except (ValueError, SyntaxError):
-            return value
+    """
+    Safely evaluate string representations of Python literals (lists/dicts).
+
+    Strings that cannot start a list, dict or string literal are returned as-is without
+    parsing. Parses are memoized; list and dict results are shallow-copied per call, so
+    rows with identical cells do not share one mutable object.
+    """
+    if isinstance(value, str) and value.lstrip()[:1] in _LITERAL_STARTS:
+        result = _literal_eval_cached(value)
+        return copy.copy(result) if isinstance(result, (list, dict)) else result
     return value
 
 
+def _fast_parse(value: Any) -> Any:
+    """Parse a cell as JSON when it looks like a JSON list/dict, else fall back to `_safe_eval`."""
+    if isinstance(value, str) and value[:1] in ("[", "{"):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return _safe_eval(value)
+
+
 def load_better_recipes(path: str | pathlib.Path = DATA_DIR / "recipes.csv") -> pd.DataFrame:
     """
     Load and preprocess the Kaggle 'Better Recipes for a Better Life' dataset.
@@ -56,31 +88,37 @@ def load_better_recipes(path: str | pathlib.Path = DATA_DIR / "recipes.csv") ->
 
     # Safely parse list/dict columns
     for col in ["ingredients", "directions", "nutrition", "timing"]:
-        df[col] = df[col].apply(_safe_eval)
+        df[col] = pd.Series([_fast_parse(v) for v in df[col].values], index=df.index)
 
     # Convert lists/dicts to strings for embedding
-    df["ingredients_str"] = df["ingredients"].apply(
-        lambda x: ", ".join(x) if isinstance(x, list) else str(x)
-    )
-    df["directions_str"] = df["directions"].apply(
-        lambda x: ". ".join(x) if isinstance(x, list) else str(x)
-    )
-    df["nutrition_str"] = df["nutrition"].apply(
-        lambda x: ", ".join([f"{k}: {v}" for k, v in x.items()]) if isinstance(x, dict) else str(x)
-    )
-    df["timing_str"] = df["timing"].apply(
-        lambda x: ", ".join([f"{k}: {v}" for k, v in x.items()]) if isinstance(x, dict) else str(x)
-    )
+    df["ingredients_str"] = [
+        ", ".join(x) if isinstance(x, list) else str(x) for x in df["ingredients"].values
+    ]
+    df["directions_str"] = [
+        ". ".join(x) if isinstance(x, list) else str(x) for x in df["directions"].values
+    ]
+    df["nutrition_str"] = [
+        ", ".join([f"{k}: {v}" for k, v in x.items()]) if isinstance(x, dict) else str(x)
+        for x in df["nutrition"].values
+    ]
+    df["timing_str"] = [
+        ", ".join([f"{k}: {v}" for k, v in x.items()]) if isinstance(x, dict) else str(x)
+        for x in df["timing"].values
+    ]
 
     # Combine all text into one field for embeddings
-    df["combined_text"] = (
-        df["recipe_name"].astype(str)
-        + ". Ingredients: " + df["ingredients_str"]
-        + ". Directions: " + df["directions_str"]
-        + ". Cuisine: " + df["cuisine_path"].astype(str)
-        + ". Nutrition: " + df["nutrition_str"]
-        + ". Timing: " + df["timing_str"]
-    )
+    df["combined_text"] = [
+        f"{name}. Ingredients: {ing}. Directions: {dirs}. Cuisine: {cuisine}"
+        f". Nutrition: {nutr}. Timing: {timing}"
+        for name, ing, dirs, cuisine, nutr, timing in zip(
+            df["recipe_name"].astype(str).values,
+            df["ingredients_str"].values,
+            df["directions_str"].values,
+            df["cuisine_path"].astype(str).values,
+            df["nutrition_str"].values,
+            df["timing_str"].values,
+        )
+    ]
 
     # Clean up whitespace and duplicates
     df = df.drop_duplicates(subset=["recipe_name"]).reset_index(drop=True)
@@ -89,20 +127,22 @@ def load_better_recipes(path: str | pathlib.Path = DATA_DIR / "recipes.csv") ->
     return df
 
 
-def recipes_to_docs(df: pd.DataFrame) -> List[Dict[str, str]]:
+def recipes_to_docs(df: pd.DataFrame) -> List[Dict[str, Any]]:
     """
     Convert DataFrame rows into list of recipe dicts for embedding search.
     """
-    docs = []
-    for _, row in df.iterrows():
-        docs.append({
-            "id": str(row["id"]),
-            "title": str(row["recipe_name"]),
-            "ingredients": str(row["ingredients_str"]),
-            "directions": str(row["directions_str"]),
-            "cuisine": str(row["cuisine_path"]),
-            "rating": str(row.get("rating", "")),
-            "text": str(row["combined_text"]),
-            "url": str(row.get("url", "")),
-        })
-    return docs
+    missing = pd.Series("", index=df.index)
+    out = pd.DataFrame({
+        "id": df["id"],
+        "title": df["recipe_name"],
+        "ingredients": df["ingredients_str"],
+        "directions": df["directions_str"],
+        "cuisine": df["cuisine_path"],
+        "text": df["combined_text"],
+        "url": df.get("url", missing),
+    }).astype(str)
+    # ratings stay numeric (plain floats, None for missing) instead of being stringified
+    ratings = pd.to_numeric(df.get("rating", pd.Series(index=df.index, dtype=float)),
+                            errors="coerce").astype(object)
+    out.insert(5, "rating", ratings.where(ratings.notna(), None))
+    return out.to_dict(orient="records")
@@ -12,52 +12,91 @@ Main Function:
     Extracts the most relevant keywords from a given text using spaCy's POS tagging.
     Only nouns, proper nouns, and adjectives are considered. Returns a list of lemmatized
     and deduplicated keywords up to the specified top_k number. Falls back to a simple
-    tokenization method if spaCy is unavailable.
+    regex tokenizer if spaCy is unavailable, returning its most frequent words of
+    three or more letters.
+
+- extract_keywords_batch(texts: List[str], top_k: int = 10, batch_size: int = 64)
+    Same as extract_keywords for many texts at once, streaming them through
+    spaCy's `nlp.pipe` in batches instead of one pipeline call per text.
 
 Dependencies:
-- spacy: for tokenization, lemmatization, and POS tagging
+- spacy: for tokenization, lemmatization, and POS tagging. The pipeline is loaded on
+  the first spaCy-backed call rather than at import. The dependency parser and
+  NER components are excluded at load time since keyword extraction only needs POS
+  tags, lemmas and stop words.
 
 
 text = "Quick and easy chicken pasta recipe with fresh herbs and garlic."
 keywords = extract_keywords(text, top_k=5)
 print(keywords)  # Example output: ['chicken', 'pasta', 'recipe', 'herb', 'garlic']
 """
+from collections import Counter
 from typing import List
-import spacy
+import re
+
+# Pipeline components extract_keywords never reads
+UNUSED_PIPES = ["parser", "ner", "senter"]
+
+# The spaCy pipeline: _UNLOADED until _get_nlp() first runs, None if spaCy is unavailable
+_UNLOADED = object()
+_nlp = _UNLOADED
+
+# Fallback tokens: runs of 3+ letters (any alphabet, no digits or underscores)
+_TOKEN_RE = re.compile(r"[^\W\d_]{3,}")
+
+def _get_nlp():
+    """Return the spaCy pipeline, loading it on first use; None without spaCy or its model."""
+    global _nlp  # pylint: disable=global-statement
+    if _nlp is _UNLOADED:
+        try:
+            import spacy  # pylint: disable=import-outside-toplevel
+            _nlp = spacy.load("en_core_web_sm", exclude=UNUSED_PIPES)
+        except (ImportError, OSError):
+            _nlp = None
+    return _nlp
+
+
+def _dedupe(tokens, top_k: int) -> List[str]:
+    """Return the first `top_k` distinct tokens, preserving order."""
+    seen = set()
+    out = []
+    for t in tokens:
+        if t not in seen:
+            seen.add(t)
+            out.append(t)
+        if len(out) >= top_k:
+            break
+    return out
+
+
+def _doc_keywords(doc, top_k: int) -> List[str]:
+    """Keywords of a processed spaCy doc: lemmas of non-stop NOUN/PROPN/ADJ tokens."""
+    tokens = [tok.lemma_.lower()
+              for tok in doc if tok.pos_ in {"NOUN", "PROPN", "ADJ"} and not tok.is_stop]
+    return _dedupe(tokens, top_k)
 
-_nlp = spacy.load("en_core_web_sm")
 
 def extract_keywords(text: str, top_k: int = 10) -> List[str]:
     """
     Simple keyword extraction:
     - If spaCy is available uses POS tagging to pick NOUN/PROPN/ADJ tokens
-    - Else falls back to splitting and returning lowercased tokens (filtered)
+    - Else falls back to the most frequent lowercased words of 3+ letters (ties in
+      order of first appearance)
     """
     if not text:
         return []
-    if _nlp:
-        doc = _nlp(text)
-        tokens = [tok.lemma_.lower()
-                  for tok in doc if tok.pos_ in {"NOUN", "PROPN", "ADJ"} and not tok.is_stop]
-        # dedupe while preserving order
-        seen = set()
-        out = []
-        for t in tokens:
-            if t not in seen:
-                seen.add(t)
-                out.append(t)
-            if len(out) >= top_k:
-                break
-    else:
-        # fallback
-        tokens = [t.strip(".,!?:;()[]").lower() for t in text.split()]
-        tokens = [t for t in tokens if len(t) > 2]
-        seen = set()
-        out = []
-        for t in tokens:
-            if t not in seen:
-                seen.add(t)
-                out.append(t)
-            if len(out) >= top_k:
-                break
-    return out
+    nlp = _get_nlp()
+    if nlp:
+        return _doc_keywords(nlp(text), top_k)
+    # fallback
+    counts = Counter(_TOKEN_RE.findall(text.lower()))
+    return [word for word, _ in counts.most_common(top_k)]
+
+
+def extract_keywords_batch(texts: List[str], top_k: int = 10,
+                           batch_size: int = 64) -> List[List[str]]:
+    """Run `extract_keywords` over many texts, batching them through `nlp.pipe`."""
+    nlp = _get_nlp()
+    if not nlp:
+        return [extract_keywords(text, top_k) for text in texts]
+    return [_doc_keywords(doc, top_k) for doc in nlp.pipe(texts, batch_size=batch_size)]
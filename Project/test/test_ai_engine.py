@@ -1,10 +1,13 @@
 """Tests for the AIEngine indexing and query functionality."""
 # pylint: disable=redefined-outer-name, unused-argument
+import json
 import pickle
+import sys
+from types import SimpleNamespace
 import pytest
 import numpy as np
 from src import ai_engine
-from src.ai_engine import AIEngine
+from src.ai_engine import AIEngine, get_engine
 
 
 # -------------------------------
@@ -16,20 +19,89 @@ class MockModel:    # pylint: disable=too-few-public-methods
     def __init__(self, name):
         self.name = name
 
-    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False):
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False,
+               normalize_embeddings=False, **kwargs):
         """Return deterministic embeddings based on text length."""
         if isinstance(texts, str):
             texts = [texts]
-        return np.array([[len(t)] for t in texts], dtype=float)
+        emb = np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+        if normalize_embeddings:
+            emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+        return emb
+
+
+class FakeHNSW:
+    """Exact inner-product stand-in for faiss.IndexHNSWFlat."""
+
+    def __init__(self, dim, m, metric):
+        self.hnsw = SimpleNamespace(efSearch=16)
+        self.args = (m, metric)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+
+    def add(self, vectors):
+        """Append vectors to the index."""
+        self.vectors = np.vstack([self.vectors, vectors])
+
+    def search(self, queries, k):
+        """Return (similarities, ids) of the k best rows per query."""
+        sims = queries @ self.vectors.T
+        idx = np.argsort(-sims, axis=1)[:, :k]
+        return np.take_along_axis(sims, idx, axis=1), idx
+
+
+def fake_write_index(index, path):
+    """Pickle a FakeHNSW to `path`."""
+    with open(path, "wb") as f:
+        pickle.dump(index, f)
+
+
+def fake_read_index(path):
+    """Load a FakeHNSW written by fake_write_index."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+FAKE_FAISS = SimpleNamespace(IndexHNSWFlat=FakeHNSW, METRIC_INNER_PRODUCT=0,
+                             write_index=fake_write_index, read_index=fake_read_index)
+
+
+@pytest.fixture(params=["fake", "real"])
+def faiss_module(request, monkeypatch):
+    """Run ANN tests against a fake faiss and, when installed, the real one."""
+    if request.param == "fake":
+        monkeypatch.setattr("src.ai_engine.faiss", FAKE_FAISS)
+    else:
+        monkeypatch.setattr("src.ai_engine.faiss", pytest.importorskip("faiss"))
 
 
 @pytest.fixture
 def mock_model(monkeypatch):
-    """Patch SentenceTransformer to use MockModel."""
-    def fake_sentence_transformer(name):
+    """Patch SentenceTransformer to use MockModel, with an empty shared-model cache."""
+    def fake_sentence_transformer(name, **kwargs):
         return MockModel(name)
 
     monkeypatch.setattr(ai_engine, "SentenceTransformer", fake_sentence_transformer)
+    monkeypatch.setattr(ai_engine, "_MODEL_CACHE", {})
+
+
+def encoder_for(vectors):
+    """Return a fake model.encode() that looks texts up in a {text: vector} dict."""
+    def encode(texts, normalize_embeddings=False, **kwargs):
+        if isinstance(texts, str):
+            return vectors[texts]
+        emb = np.array([vectors[t] for t in texts])
+        if normalize_embeddings:
+            emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+        return emb
+    return encode
+
+
+def write_cache(cache_path, embeddings, docs, **overrides):
+    """Write an embedding cache (.npy plus JSON sidecar) the way AIEngine.index does."""
+    np.save(cache_path, embeddings)
+    meta = {"model": "all-MiniLM-L6-v2", "precision": "float32", "n": len(docs),
+            "ids": [d["id"] for d in docs], "fingerprint": None, **overrides}
+    cache_path.with_suffix(".json").write_text(json.dumps(meta), encoding="utf-8")
 
 
 @pytest.fixture
@@ -48,7 +120,7 @@ def sample_docs():
 
 def test_index_creates_embeddings(tmp_path, monkeypatch, mock_model, sample_docs):
     """Indexing should create embeddings and write cache."""
-    cache_path = tmp_path / "embeddings.pkl"
+    cache_path = tmp_path / "embeddings.npy"
     monkeypatch.setattr("src.ai_engine.EMBED_CACHE", cache_path)
 
     engine = AIEngine()
@@ -57,49 +129,227 @@ def test_index_creates_embeddings(tmp_path, monkeypatch, mock_model, sample_docs
     assert engine.embeddings is not None
     assert cache_path.exists(), "Embedding cache file should be created"
 
-    with open(cache_path, "rb") as f:
-        cached = pickle.load(f)
+    meta = json.loads(cache_path.with_suffix(".json").read_text(encoding="utf-8"))
 
-    assert cached["model"] == engine.model_name
-    assert len(cached["docs"]) == len(sample_docs)
+    assert meta["model"] == engine.model_name
+    assert meta["n"] == len(sample_docs)
+    assert meta["ids"] == ["0", "1", "2"]
+    assert np.array_equal(np.load(cache_path), engine.embeddings)
 
 
 def test_index_uses_cache_when_available(tmp_path, monkeypatch, mock_model, sample_docs):
     """Index should use cache if it exists."""
-    cache_path = tmp_path / "embeddings.pkl"
+    cache_path = tmp_path / "embeddings.npy"
     monkeypatch.setattr("src.ai_engine.EMBED_CACHE", cache_path)
 
     # Pre-create a fake cache file
-    fake_embeddings = np.array([[1.0], [2.0], [3.0]])
-    with open(cache_path, "wb") as f:
-        pickle.dump({"model": "all-MiniLM-L6-v2", "docs": sample_docs,
-                     "embeddings": fake_embeddings}, f)
-
+    fake_embeddings = np.array([[0.6, 0.8], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
     engine = AIEngine()
+    write_cache(cache_path, fake_embeddings, sample_docs,
+                fingerprint=engine.fingerprint(sample_docs))
+
     engine.index(sample_docs)
 
-    # Should load embeddings from cache, not recompute
+    # Should load embeddings from cache, not recompute, and memory-map them
     assert np.array_equal(engine.embeddings, fake_embeddings)
+    assert isinstance(engine.embeddings, np.memmap)
+
+
+def test_recompute_leaves_mapped_cache_readable(tmp_path, monkeypatch, mock_model, sample_docs):
+    """Rewriting the cache swaps in a new file instead of overwriting a mapped one."""
+    cache_path = tmp_path / "embeddings.npy"
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", cache_path)
+    old = np.array([[0.6, 0.8], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    reader = AIEngine()
+    write_cache(cache_path, old, sample_docs, fingerprint=reader.fingerprint(sample_docs))
+    reader.index(sample_docs)
+    assert isinstance(reader.embeddings, np.memmap)
+
+    AIEngine().index(sample_docs, force_recompute=True)
+
+    assert np.array_equal(reader.embeddings, old)
+    assert not np.array_equal(np.load(cache_path), old)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_index_ignores_cache_for_different_docs(tmp_path, monkeypatch, mock_model, sample_docs):
+    """A cache built for other doc ids must not be reused."""
+    cache_path = tmp_path / "embeddings.npy"
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", cache_path)
+    write_cache(cache_path, np.zeros((3, 2), dtype=np.float32),
+                [{"id": "a"}, {"id": "b"}, {"id": "c"}])
+
+    engine = AIEngine()
+    engine.index(sample_docs)
+
+    assert not isinstance(engine.embeddings, np.memmap)
+    assert np.allclose(np.linalg.norm(engine.embeddings, axis=1), 1.0)
+
+
+def test_index_ignores_cache_when_doc_text_changes(tmp_path, monkeypatch, mock_model,
+                                                  sample_docs):
+    """Editing a doc's text changes the fingerprint, so the cache is rebuilt."""
+    cache_path = tmp_path / "embeddings.npy"
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", cache_path)
+    engine = AIEngine()
+    engine.index(sample_docs)
+
+    edited = [dict(d) for d in sample_docs]
+    edited[0]["text"] = "apple crumble recipe"
+    assert engine.fingerprint(edited) != engine.fingerprint(sample_docs)
+
+    engine.index(edited)
+    assert not isinstance(engine.embeddings, np.memmap)
+    assert np.array_equal(np.load(cache_path), engine.embeddings)
+
+
+def test_docs_are_stored_as_columns(mock_model):
+    """Docs round-trip through per-field columns, including docs missing a field."""
+    engine = AIEngine()
+    docs = [{"id": "0", "text": "a", "url": "u"}, {"id": "1", "text": "b"}]
+    engine.docs = docs
+
+    assert engine.columns["text"] == ["a", "b"]
+    assert engine.n_docs == 2
+    assert engine.doc(1) == {"id": "1", "text": "b"}
+    assert engine.docs == docs
+
+
+def test_docs_view_is_read_only_and_indexes_lazily(mock_model):
+    """engine.docs indexes like a list but cannot be changed in place."""
+    engine = AIEngine()
+    docs = [{"id": str(i), "text": f"t{i}"} for i in range(5)]
+    engine.docs = docs
+
+    view = engine.docs
+    assert len(view) == 5
+    assert view[-1] == docs[4]
+    assert view[1:3] == docs[1:3]
+    assert list(view) == docs
+    assert view != docs[:4]
+    assert view != "t0t1t2t3t4"
+    assert repr(view) == f"DocsView({docs!r})"
+    with pytest.raises(IndexError):
+        view[5]  # pylint: disable=pointless-statement
+    with pytest.raises(AttributeError):
+        view.append({"id": "5", "text": "t5"})  # pylint: disable=no-member
+
+    view[0]["text"] = "changed"
+    assert engine.doc(0) == docs[0]
+
+
+def test_query_scores_equal_cosine_similarity(tmp_path, monkeypatch, mock_model):
+    """The normalize-once matmul gives the same scores as a per-doc cosine loop."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
+    docs, encode = ann_docs_and_encoder()
+    engine = AIEngine()
+    monkeypatch.setattr(engine.model, "encode", encode)
+    engine.index(docs)
+
+    q = encode("query")
+    expected = []
+    for d in docs:
+        v = encode([d["text"]])[0]
+        expected.append((float(v @ q / (np.linalg.norm(v) * np.linalg.norm(q))), d["id"]))
+    expected.sort(reverse=True)
+
+    results = engine.query("query", top_k=5)
+    assert [d["id"] for d, _ in results] == [i for _, i in expected[:5]]
+    assert np.allclose([s for _, s in results], [s for s, _ in expected[:5]], atol=1e-6)
+
+
+def test_index_passes_batch_size_to_encode(tmp_path, monkeypatch, mock_model, sample_docs):
+    """The engine's batch_size and normalization reach model.encode, also for query_batch."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
+    engine = AIEngine(batch_size=64)
+    seen = {}
+    real_encode = engine.model.encode
+
+    def encode(texts, **kwargs):
+        seen.update(kwargs)
+        return real_encode(texts, **kwargs)
+    monkeypatch.setattr(engine.model, "encode", encode)
+
+    engine.index(sample_docs)
+
+    assert seen["batch_size"] == 64
+    assert seen["normalize_embeddings"] is True
+
+    seen.clear()
+    engine.query_batch(["banana", "apple"])
+    assert seen["batch_size"] == 64
+
+
+def test_index_uses_worker_pool_for_large_corpora(tmp_path, monkeypatch, mock_model):
+    """num_workers > 0 encodes big corpora through a multi-process pool."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
+    monkeypatch.setattr("src.ai_engine.MULTI_PROCESS_MIN_DOCS", 3)
+    engine = AIEngine(batch_size=8)
+    calls = []
+
+    def start_pool(devices):
+        calls.append(("start", devices))
+        return "pool"
+
+    def encode_multi_process(texts, pool, batch_size):
+        calls.append(("encode", pool, batch_size))
+        return np.array([[3.0, 4.0]] * len(texts))
+    monkeypatch.setattr(engine.model, "start_multi_process_pool", start_pool, raising=False)
+    monkeypatch.setattr(engine.model, "encode_multi_process", encode_multi_process,
+                        raising=False)
+    monkeypatch.setattr(engine.model, "stop_multi_process_pool",
+                        lambda pool: calls.append(("stop", pool)), raising=False)
+
+    small = [{"id": str(i), "text": f"t{i}"} for i in range(2)]
+    engine.index(small, num_workers=2)
+    assert not calls
+
+    big = [{"id": str(i), "text": f"t{i}"} for i in range(3)]
+    engine.index(big, num_workers=2)
+    assert calls == [("start", ["cpu", "cpu"]), ("encode", "pool", 8), ("stop", "pool")]
+    assert engine.embeddings.dtype == np.float32
+    assert np.allclose(engine.embeddings, [[0.6, 0.8]] * 3)
+
+
+def test_query_embeddings_are_cached(monkeypatch, mock_model, sample_docs):
+    """Repeated query text should be encoded only once."""
+    engine = AIEngine()
+    engine.docs = sample_docs
+    engine.embeddings = np.eye(3, 2, dtype=np.float32)
+    calls = []
+
+    def encode(text, **kwargs):
+        calls.append(text)
+        return np.array([1.0, 0.0])
+    monkeypatch.setattr(engine.model, "encode", encode)
+
+    first = engine.query("pasta", top_k=2)
+    assert engine.query("pasta", top_k=2) == first
+    engine.query("salad", top_k=2)
+    assert calls == ["pasta", "salad"]
 
 
 def test_index_force_recompute_ignores_cache(tmp_path, monkeypatch, mock_model, sample_docs):
     """force_recompute=True must ignore cache and recompute embeddings."""
-    cache_path = tmp_path / "embeddings.pkl"
+    cache_path = tmp_path / "embeddings.npy"
     monkeypatch.setattr("src.ai_engine.EMBED_CACHE", cache_path)
 
     # Write a fake cache that should be ignored
-    with open(cache_path, "wb") as f:
-        pickle.dump({"model": "bad", "docs": [], "embeddings": np.zeros((1, 1))}, f)
+    write_cache(cache_path, np.zeros((1, 1), dtype=np.float32), [], model="bad")
 
     engine = AIEngine()
     engine.index(sample_docs, force_recompute=True)
 
     assert engine.embeddings is not None
     assert not np.array_equal(engine.embeddings, np.zeros((1, 1)))
+    # freshly encoded embeddings are a regular, writeable array, not a memmap
+    assert not isinstance(engine.embeddings, np.memmap)
+    assert engine.embeddings.flags.writeable
 
 
-def test_query_returns_ranked_results(monkeypatch, mock_model, sample_docs):
+def test_query_returns_ranked_results(tmp_path, monkeypatch, mock_model, sample_docs):
     """query() should return sorted (doc, score) pairs."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
     engine = AIEngine()
     engine.index(sample_docs)
 
@@ -114,6 +364,346 @@ def test_query_returns_ranked_results(monkeypatch, mock_model, sample_docs):
         assert isinstance(score, float)
 
 
+@pytest.mark.parametrize("precision", ["float32", "float16", "int8"])
+def test_query_batch_matches_single_queries(tmp_path, monkeypatch, mock_model, sample_docs,
+                                            precision):
+    """query_batch() returns one ranked list per query, equal to calling query() on each."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
+    engine = AIEngine(precision=precision)
+    engine.index(sample_docs)
+    queries = ["a", "banana", "a much longer query text"]
+
+    results = engine.query_batch(queries, top_k=2)
+
+    assert len(results) == len(queries)
+    for text, ranked in zip(queries, results):
+        assert len(ranked) == 2
+        expected = engine.query(text, top_k=2)
+        assert [d["id"] for d, _ in ranked] == [d["id"] for d, _ in expected]
+        assert np.allclose([s for _, s in ranked], [s for _, s in expected], atol=1e-5)
+    assert engine.query_batch(queries, top_k=0) == [[], [], []]
+    assert not engine.query_batch([])
+
+
+def test_query_top_k_is_sorted_and_clamped(monkeypatch, mock_model, sample_docs):
+    """query() should return the best matches in descending order, at most n_docs."""
+    engine = AIEngine()
+    engine.docs = sample_docs
+    engine.embeddings = np.array([[0.0, 1.0], [1.0, 0.0], [0.6, 0.8]], dtype=np.float32)
+    monkeypatch.setattr(engine.model, "encode", lambda *a, **kw: np.array([1.0, 0.0]))
+
+    results = engine.query("anything", top_k=10)
+
+    assert [doc["id"] for doc, _ in results] == ["1", "2", "0"]
+    assert not engine.query("anything", top_k=0)
+
+
+def test_query_reuses_score_buffer(monkeypatch, mock_model, sample_docs):
+    """Repeated queries score into one buffer, resized when the corpus size changes."""
+    engine = AIEngine()
+    engine.docs = sample_docs
+    engine.embeddings = np.array([[0.0, 1.0], [1.0, 0.0], [0.6, 0.8]], dtype=np.float32)
+    monkeypatch.setattr(engine.model, "encode", lambda text, **kw: np.array([1.0, len(text)]))
+
+    first = engine.query("a", top_k=3)
+    buf = engine._scores_buf  # pylint: disable=protected-access
+    assert engine.query("abc", top_k=3) != first
+    assert engine._scores_buf is buf  # pylint: disable=protected-access
+    assert engine.query("a", top_k=3) == first
+
+    engine.docs = sample_docs[:2]
+    engine.embeddings = engine.embeddings[:2]
+    assert len(engine.query("a", top_k=3)) == 2
+    assert engine._scores_buf.shape == (2,)  # pylint: disable=protected-access
+
+
+def test_int8_precision_matches_float32_ranking(tmp_path, monkeypatch, mock_model, sample_docs):
+    """int8 embeddings should be cached as int8 and score close to float32 cosine."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
+    vectors = {d["text"]: np.array([i + 1.0, 3.0 - i, 0.5 * i]) for i, d in enumerate(sample_docs)}
+    vectors["query"] = np.array([1.0, 1.0, 0.0])
+    encode = encoder_for(vectors)
+
+    results = {}
+    for precision in ("float32", "float16", "int8"):
+        engine = AIEngine(precision=precision)
+        monkeypatch.setattr(engine.model, "encode", encode)
+        engine.index(sample_docs, force_recompute=True)
+        results[precision] = engine.query("query", top_k=3)
+
+    assert engine.embeddings.dtype == np.int8
+    assert np.load(tmp_path / "embeddings.npy").dtype == np.int8
+    assert np.load(tmp_path / "embeddings.scales.npy").shape == (3,)
+
+    # a second int8 engine reads the codes and scales back from the cache
+    cached = AIEngine(precision="int8")
+    monkeypatch.setattr(cached.model, "encode", encode)
+    cached.index(sample_docs)
+    assert np.array_equal(cached.scales, engine.scales)
+    assert cached.query("query", top_k=3) == results["int8"]
+    for precision in ("float16", "int8"):
+        assert ([d["id"] for d, _ in results[precision]]
+                == [d["id"] for d, _ in results["float32"]])
+        assert np.allclose([s for _, s in results[precision]],
+                           [s for _, s in results["float32"]], atol=0.02)
+
+
+def test_float16_scores_match_float32_in_blocks():
+    """Blockwise float16 upcasting gives the float32 matvec, including a ragged tail."""
+    rng = np.random.default_rng(2)
+    emb = rng.normal(size=(50, 16)).astype(np.float16)
+    q_emb = rng.normal(size=16).astype(np.float32)
+
+    scores = ai_engine._upcast_dots(emb, q_emb, chunk_rows=8)  # pylint: disable=protected-access
+
+    assert scores.dtype == np.float32
+    assert np.allclose(scores, emb.astype(np.float32) @ q_emb, atol=1e-5)
+
+
+def test_int8_dot_kernel_matches_numpy():
+    """The (optional numba) int8 kernel agrees with the numpy int32 matmul."""
+    rng = np.random.default_rng(0)
+    codes = rng.integers(-127, 128, size=(50, 384), dtype=np.int8)
+    q_codes = rng.integers(-127, 128, size=384, dtype=np.int8)
+
+    expected = ai_engine._int8_dots_numpy(codes, q_codes)  # pylint: disable=protected-access
+    assert np.array_equal(ai_engine._int8_dots(codes, q_codes),  # pylint: disable=protected-access
+                          expected)
+
+
+def ann_docs_and_encoder():
+    """Return 50 docs with random 8-d embeddings and an encode() serving them."""
+    rng = np.random.default_rng(1)
+    docs = [{"id": str(i), "text": f"doc {i}"} for i in range(50)]
+    vectors = {d["text"]: rng.normal(size=8) for d in docs}
+    vectors["query"] = vectors["doc 7"] + 0.1 * rng.normal(size=8)
+    return docs, encoder_for(vectors)
+
+
+def test_ann_index_matches_exact_scan(tmp_path, monkeypatch, mock_model, faiss_module):
+    """With faiss available, ann=True builds, caches and searches an HNSW index."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
+    docs, encode = ann_docs_and_encoder()
+
+    exact = AIEngine()
+    monkeypatch.setattr(exact.model, "encode", encode)
+    exact.index(docs)
+    engine = AIEngine(ann=True)
+    monkeypatch.setattr(engine.model, "encode", encode)
+    engine.index(docs, force_recompute=True)
+
+    assert engine.ann_index is not None
+    assert (tmp_path / "embeddings.hnsw").exists()
+    results = engine.query("query", top_k=5)
+    assert results[0][0]["id"] == "7"
+    assert np.allclose([s for _, s in results], [s for _, s in exact.query("query", top_k=5)],
+                       atol=1e-5)
+
+    cached = AIEngine(ann=True)
+    monkeypatch.setattr(cached.model, "encode", encode)
+    cached.index(docs)
+    assert cached.ann_index is not None
+    assert cached.query("query", top_k=5) == results
+    batched = cached.query_batch(["query", "doc 3"], top_k=5)[0]
+    assert [d["id"] for d, _ in batched] == [d["id"] for d, _ in results]
+    assert np.allclose([s for _, s in batched], [s for _, s in results], atol=1e-5)
+
+
+def test_ann_falls_back_to_scan_without_faiss(tmp_path, monkeypatch, mock_model):
+    """ann=True without faiss (or with int8) silently uses the exact scan."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
+    monkeypatch.setattr("src.ai_engine.faiss", None)
+    docs, encode = ann_docs_and_encoder()
+
+    engine = AIEngine(ann=True)
+    monkeypatch.setattr(engine.model, "encode", encode)
+    engine.index(docs)
+
+    assert engine.ann_index is None
+    assert engine.query("query", top_k=1)[0][0]["id"] == "7"
+
+
+def test_engines_share_loaded_models(mock_model):
+    """Engines reuse one model per (name, device) instead of reloading it."""
+    first = AIEngine()
+    assert AIEngine().model is first.model
+    assert AIEngine(device="cpu").model is not first.model
+    assert AIEngine("other-model").model is not first.model
+
+
+def test_torch_threads_env_sets_thread_count(monkeypatch, mock_model):
+    """AIENGINE_TORCH_THREADS is applied to torch when a model is loaded."""
+    threads = []
+    monkeypatch.setitem(sys.modules, "torch", SimpleNamespace(set_num_threads=threads.append))
+
+    AIEngine()
+    assert not threads
+
+    monkeypatch.setenv(ai_engine.TORCH_THREADS_ENV, "2")
+    AIEngine("other-model")
+    assert threads == [2]
+
+
+@pytest.mark.parametrize("value", ["", "auto", "0", "-1"])
+def test_invalid_torch_threads_env_is_ignored(monkeypatch, capsys, mock_model, value):
+    """A non-positive or non-numeric AIENGINE_TORCH_THREADS warns instead of crashing."""
+    threads = []
+    monkeypatch.setitem(sys.modules, "torch", SimpleNamespace(set_num_threads=threads.append))
+    monkeypatch.setenv(ai_engine.TORCH_THREADS_ENV, value)
+
+    AIEngine()
+
+    assert not threads
+    assert f"Ignoring {ai_engine.TORCH_THREADS_ENV}" in capsys.readouterr().out
+
+
+def patch_onnx_loader(monkeypatch, tmp_path, missing=()):
+    """Fake SentenceTransformer whose hub repos lack the `missing` files; returns its calls."""
+    calls = []
+
+    def fake_sentence_transformer(name, **kwargs):
+        calls.append((name, kwargs))
+        local = name.startswith(str(tmp_path))
+        if not local and kwargs.get("model_kwargs", {}).get("file_name") in missing:
+            raise OSError(f"{name} has no such file")
+        return MockModel(name)
+
+    monkeypatch.setattr(ai_engine, "SentenceTransformer", fake_sentence_transformer)
+    monkeypatch.setattr(ai_engine, "_MODEL_CACHE", {})
+    monkeypatch.setattr(ai_engine, "ONNX_CACHE", tmp_path / "onnx")
+    monkeypatch.setattr(ai_engine, "_onnx_available", lambda: True)
+    monkeypatch.setattr(ai_engine, "_cpu_quantization_config", lambda: "avx2")
+    return calls
+
+
+def test_onnx_backend_loads_quantized_export(monkeypatch, tmp_path):
+    """backend='onnx' loads the repo's int8 file for this CPU, or drops to torch without optimum."""
+    calls = patch_onnx_loader(monkeypatch, tmp_path)
+
+    onnx_engine = AIEngine(backend="onnx")
+    assert onnx_engine.backend == "onnx"
+    assert calls[-1] == (ai_engine.DEFAULT_MODEL, {
+        "device": None, "backend": "onnx",
+        "model_kwargs": {"file_name": "onnx/model_qint8_avx2.onnx"}})
+
+    monkeypatch.setattr(ai_engine, "_onnx_available", lambda: False)
+    torch_engine = AIEngine(backend="onnx")
+    assert torch_engine.backend == "torch"
+    assert "backend" not in calls[-1][1]
+    docs = [{"id": "1", "text": "a"}]
+    assert onnx_engine.fingerprint(docs) != torch_engine.fingerprint(docs)
+
+
+def test_onnx_backend_exports_model_without_quantized_file(monkeypatch, tmp_path):
+    """A repo without the CPU's int8 file is exported and quantized once, locally."""
+    file_name = "onnx/model_qint8_avx2.onnx"
+    calls = patch_onnx_loader(monkeypatch, tmp_path, missing={file_name})
+    exports = []
+
+    def fake_export(model_name, config, export_dir):
+        exports.append((model_name, config))
+        (export_dir / "onnx").mkdir(parents=True)
+        (export_dir / file_name).write_bytes(b"")
+
+    monkeypatch.setattr(ai_engine, "_export_quantized_onnx", fake_export)
+
+    engine = AIEngine("org/no-export-model", backend="onnx")
+    export_dir = str(tmp_path / "onnx" / "org--no-export-model")
+    assert engine.backend == "onnx"
+    assert exports == [("org/no-export-model", "avx2")]
+    assert calls[-1] == (export_dir, {"device": None, "backend": "onnx",
+                                      "model_kwargs": {"file_name": file_name}})
+
+    # the local export is reused without asking the model repo again
+    monkeypatch.setattr(ai_engine, "_MODEL_CACHE", {})
+    AIEngine("org/no-export-model", backend="onnx")
+    assert len(exports) == 1
+    assert calls[-1][0] == export_dir
+
+
+def test_onnx_backend_falls_back_to_torch_when_load_fails(monkeypatch, tmp_path):
+    """If neither the repo file nor a local export works, the engine uses torch."""
+    patch_onnx_loader(monkeypatch, tmp_path, missing={"onnx/model_qint8_avx2.onnx"})
+
+    def failing_export(model_name, config, export_dir):
+        raise RuntimeError("export failed")
+
+    monkeypatch.setattr(ai_engine, "_export_quantized_onnx", failing_export)
+
+    engine = AIEngine("org/no-export-model", backend="onnx")
+
+    assert engine.backend == "torch"
+    assert isinstance(engine.model, MockModel)
+
+
+def test_export_quantized_onnx_saves_and_quantizes(monkeypatch, tmp_path):
+    """The local export saves the ONNX model, then adds the CPU's int8 variant."""
+    events = []
+
+    class FakeOnnxModel:    # pylint: disable=too-few-public-methods
+        """Records how it is loaded and saved."""
+
+        def __init__(self, name, **kwargs):
+            events.append(("load", name, kwargs))
+
+        def save(self, path):
+            """Record the save directory."""
+            events.append(("save", path))
+
+    def fake_quantize(model, config, path, file_suffix=None):
+        events.append(("quantize", config, path, file_suffix))
+
+    monkeypatch.setattr(ai_engine, "SentenceTransformer", FakeOnnxModel)
+    monkeypatch.setitem(sys.modules, "sentence_transformers",
+                        SimpleNamespace(export_dynamic_quantized_onnx_model=fake_quantize))
+
+    ai_engine._export_quantized_onnx("org/model", "arm64", tmp_path)  # pylint: disable=protected-access
+
+    assert events == [("load", "org/model", {"backend": "onnx"}), ("save", str(tmp_path)),
+                      ("quantize", "arm64", str(tmp_path), "qint8_arm64")]
+    assert isinstance(ai_engine._cpu_flags(), set)  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize("machine, flags, expected", [
+    ("aarch64", set(), "arm64"),
+    ("x86_64", {"avx2", "avx512f", "avx512_vnni"}, "avx512_vnni"),
+    ("x86_64", {"avx2", "avx512f"}, "avx512"),
+    ("x86_64", {"sse4_2", "avx2"}, "avx2"),
+    ("x86_64", {"sse4_2"}, None),
+])
+def test_cpu_quantization_config(monkeypatch, machine, flags, expected):
+    """The int8 ONNX variant follows the CPU's architecture and vector extensions."""
+    monkeypatch.setattr(ai_engine.platform, "machine", lambda: machine)
+    monkeypatch.setattr(ai_engine, "_cpu_flags", lambda: flags)
+
+    assert ai_engine._cpu_quantization_config() == expected  # pylint: disable=protected-access
+
+
+def test_sentence_transformers_imported_on_first_model_load(monkeypatch):
+    """sentence_transformers is imported when a model is first needed, not at import."""
+    monkeypatch.setattr(ai_engine, "SentenceTransformer", None)
+    monkeypatch.setattr(ai_engine, "_MODEL_CACHE", {})
+    monkeypatch.setitem(sys.modules, "sentence_transformers",
+                        SimpleNamespace(SentenceTransformer=lambda name, **kw: MockModel(name)))
+
+    engine = AIEngine()
+
+    assert isinstance(engine.model, MockModel)
+    assert ai_engine.SentenceTransformer is not None
+
+
+def test_invalid_backend_raises(mock_model):
+    """Unknown backends should be rejected."""
+    with pytest.raises(ValueError):
+        AIEngine(backend="tensorrt")
+
+
+def test_invalid_precision_raises(mock_model):
+    """Unknown precision values should be rejected."""
+    with pytest.raises(ValueError):
+        AIEngine(precision="int4")
+
+
 def test_query_without_index_raises():
     """Query without indexing should raise RuntimeError."""
     engine = AIEngine()
@@ -123,7 +713,9 @@ def test_query_without_index_raises():
 
 def test_index_handles_corrupt_cache(tmp_path, monkeypatch, mock_model, sample_docs, capsys):
     """Ensure indexing recomputes if cache file is corrupt."""
-    cache_path = tmp_path / "embeddings.pkl"
+    cache_path = tmp_path / "embeddings.npy"
+    write_cache(cache_path, np.zeros((3, 2), dtype=np.float32), sample_docs,
+                fingerprint=AIEngine().fingerprint(sample_docs))
     cache_path.write_bytes(b"")
 
     # Patch EMBED_CACHE to point to our corrupt file
@@ -140,3 +732,21 @@ def test_index_handles_corrupt_cache(tmp_path, monkeypatch, mock_model, sample_d
 
     # And embeddings should now be computed fresh
     assert engine.embeddings is not None
+
+
+def test_get_engine_is_shared_and_recompute_reuses_model(tmp_path, monkeypatch, mock_model,
+                                                        sample_docs):
+    """get_engine() builds one engine per model; force_recompute keeps that engine."""
+    monkeypatch.setattr("src.ai_engine.EMBED_CACHE", tmp_path / "embeddings.npy")
+    monkeypatch.setattr("src.ai_engine._ENGINES", {})
+    loads = []
+    monkeypatch.setattr("src.ai_engine.load_better_recipes", lambda: loads.append(1))
+    monkeypatch.setattr("src.ai_engine.recipes_to_docs", lambda df: sample_docs)
+
+    engine = get_engine()
+    assert get_engine() is engine
+    assert len(loads) == 1
+    assert engine.docs == sample_docs
+
+    assert get_engine(force_recompute=True) is engine
+    assert len(loads) == 2
@@ -28,20 +28,16 @@ def test_run_cli_basic(monkeypatch, fake_docs):  # pylint: disable=redefined-out
     monkeypatch.setattr(sys_module, "argv", ["app.py", "--query", "apple", "--topk", "1"])
 
     # Patch all external dependencies
-    with patch("src.app.load_better_recipes") as mock_load, \
-         patch("src.app.recipes_to_docs") as mock_docs, \
-         patch("src.app.AIEngine") as mock_engine, \
+    with patch("src.app.get_engine") as mock_get_engine, \
          patch("src.app.extract_keywords") as mock_keywords:
 
         # Setup return values
-        mock_load.return_value = fake_docs
-        mock_docs.return_value = fake_docs
         mock_keywords.return_value = ["apple", "pie"]
 
         # Mock AIEngine instance
         mock_engine_instance = MagicMock()
         mock_engine_instance.query.return_value = [(fake_docs[0], 0.95)]
-        mock_engine.return_value = mock_engine_instance
+        mock_get_engine.return_value = mock_engine_instance
 
         # Capture printed output
         out = StringIO()
@@ -57,8 +53,8 @@ def test_run_cli_basic(monkeypatch, fake_docs):  # pylint: disable=redefined-out
         assert "Apple Pie" in output
         assert "score: 0.950" in output
 
-        # Ensure engine.index was called
-        mock_engine_instance.index.assert_called_once_with(fake_docs, force_recompute=False)
+        # Ensure the shared engine was requested without recomputing
+        mock_get_engine.assert_called_once_with(force_recompute=False)
         mock_engine_instance.query.assert_called_once_with("apple", top_k=1)
 
 
@@ -66,18 +62,14 @@ def test_run_cli_force_recompute(monkeypatch, fake_docs):   # pylint: disable=re
     """Test CLI behavior with the --recompute flag."""
     monkeypatch.setattr(sys_module, "argv", ["app.py", "--query", "banana", "--recompute"])
 
-    with patch("src.app.load_better_recipes") as mock_load, \
-         patch("src.app.recipes_to_docs") as mock_docs, \
-         patch("src.app.AIEngine") as mock_engine, \
+    with patch("src.app.get_engine") as mock_get_engine, \
          patch("src.app.extract_keywords") as mock_keywords:
 
-        mock_load.return_value = fake_docs
-        mock_docs.return_value = fake_docs
         mock_keywords.return_value = ["banana"]
 
         mock_engine_instance = MagicMock()
         mock_engine_instance.query.return_value = [(fake_docs[1], 0.99)]
-        mock_engine.return_value = mock_engine_instance
+        mock_get_engine.return_value = mock_engine_instance
 
         out = StringIO()
         monkeypatch.setattr(sys_module, "stdout", out)
@@ -88,4 +80,4 @@ def test_run_cli_force_recompute(monkeypatch, fake_docs):   # pylint: disable=re
         assert "banana" in output
         assert "Banana Smoothie" in output
 
-        mock_engine_instance.index.assert_called_once_with(fake_docs, force_recompute=True)
+        mock_get_engine.assert_called_once_with(force_recompute=True)
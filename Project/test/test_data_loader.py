@@ -4,6 +4,8 @@ import pandas as pd
 import pytest
 
 from src.data_loader import (
+    _fast_parse,
+    _literal_eval_cached,
     _safe_eval,
     load_better_recipes,
     recipes_to_docs,
@@ -34,6 +36,28 @@ def test_safe_eval_non_string_pass_through():
     assert _safe_eval(10) == 10
 
 
+def test_safe_eval_skips_non_literals_and_memoizes():
+    """Prose is returned without parsing; repeated literals hit the cache."""
+    _literal_eval_cached.cache_clear()
+
+    assert _safe_eval("3 tablespoons butter, 2 apples") == "3 tablespoons butter, 2 apples"
+    assert _literal_eval_cached.cache_info().misses == 0
+
+    for _ in range(3):
+        assert _safe_eval(" ['salt', 'pepper']") == ["salt", "pepper"]
+    info = _literal_eval_cached.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test_fast_parse_json_and_python_literals():
+    """Parses JSON directly and falls back to literal_eval for Python reprs."""
+    assert _fast_parse('["a", "b"]') == ["a", "b"]
+    assert _fast_parse('{"calories": 200}') == {"calories": 200}
+    assert _fast_parse("['a', 'b']") == ["a", "b"]
+    assert _fast_parse("[not json] nor python") == "[not json] nor python"
+    assert _fast_parse(3.5) == 3.5
+
+
 # ------------------------------
 # load_better_recipes tests
 # ------------------------------
@@ -75,6 +99,27 @@ def test_load_better_recipes_parses_literal_columns(sample_csv_file):
     assert isinstance(df.loc[0, "timing"], dict)
 
 
+def test_load_better_recipes_duplicate_cells_are_independent(tmp_path):
+    """Rows with identical literal cells get their own list/dict, despite the parse cache."""
+    p = tmp_path / "recipes.csv"
+    pd.DataFrame({
+        "recipe_name": ["Plain Eggs", "Fancy Eggs"],
+        "ingredients": ["['egg', 'salt']"] * 2,
+        "directions": ["['whisk', 'fry']"] * 2,
+        "nutrition": ["{'calories': 90}"] * 2,
+        "timing": ["{'prep': 2}"] * 2,
+        "cuisine_path": ["breakfast"] * 2,
+    }).to_csv(p, index=False)
+    df = load_better_recipes(p)
+
+    df.loc[0, "ingredients"].append("truffle")
+    df.loc[0, "nutrition"]["calories"] = 400
+
+    assert df.loc[1, "ingredients"] == ["egg", "salt"]
+    assert df.loc[1, "nutrition"] == {"calories": 90}
+    assert _safe_eval("['egg', 'salt']") == ["egg", "salt"]
+
+
 def test_load_better_recipes_creates_string_fields(sample_csv_file):
     """Creates string representations of ingredients, directions, nutrition, and timing."""
     df = load_better_recipes(sample_csv_file)
@@ -156,6 +201,24 @@ def test_recipes_to_docs_matches_dataframe_content(sample_csv_file):
     assert "chicken, pasta" in first["ingredients"]
     assert "cook. mix" in first["directions"]
     assert first["cuisine"] == "italian"
-    assert first["rating"] == "4.5"
+    assert first["rating"] == 4.5
     assert first["url"] == "http://example.com/1"
     assert "Ingredients:" in first["text"]
+
+
+def test_recipes_to_docs_without_optional_columns():
+    """A missing rating becomes None, a missing url an empty string."""
+    df = pd.DataFrame({
+        "id": [0],
+        "recipe_name": ["Toast"],
+        "ingredients_str": ["bread"],
+        "directions_str": ["toast it"],
+        "cuisine_path": ["breakfast"],
+        "combined_text": ["Toast. Ingredients: bread"],
+    })
+    docs = recipes_to_docs(df)
+
+    assert docs == [{
+        "id": "0", "title": "Toast", "ingredients": "bread", "directions": "toast it",
+        "cuisine": "breakfast", "rating": None, "text": "Toast. Ingredients: bread", "url": "",
+    }]
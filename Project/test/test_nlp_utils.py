@@ -1,4 +1,7 @@
 """Tests for the nlp_utils.extract_keywords function."""
+import sys
+
+import pytest
 from src import nlp_utils
 
 
@@ -39,6 +42,26 @@ def test_extract_keywords_top_k_limit():
     assert len(keywords) == 2
 
 
+def test_pipeline_excludes_unused_components():
+    """Parser and NER are not loaded since keywords only need POS and lemmas."""
+    pipeline = nlp_utils._get_nlp()  # pylint: disable=protected-access
+    if pipeline is None:
+        pytest.skip("spaCy or en_core_web_sm is not installed")
+    for name in nlp_utils.UNUSED_PIPES:
+        assert name not in pipeline.pipe_names
+
+
+def test_extract_keywords_batch_matches_single_calls():
+    """Batch extraction gives the same keywords as one call per text."""
+    pipeline = nlp_utils._get_nlp()  # pylint: disable=protected-access
+    texts = ["Apple apple APPLES banana banana", "", "red car fast car shiny car"] * 40
+
+    batch = nlp_utils.extract_keywords_batch(texts, top_k=2, batch_size=16)
+
+    assert batch == [nlp_utils.extract_keywords(t, top_k=2) for t in texts]
+    assert nlp_utils._nlp is pipeline  # pylint: disable=protected-access
+
+
 # ------------------------------
 # Fallback mode (simulate no spaCy)
 # ------------------------------
@@ -69,3 +92,27 @@ def test_extract_keywords_fallback_top_k(monkeypatch):
     keywords = nlp_utils.extract_keywords(text, top_k=3)
 
     assert len(keywords) == 3
+
+
+def test_extract_keywords_batch_fallback(monkeypatch):
+    """Batch extraction also works without spaCy."""
+    monkeypatch.setattr(nlp_utils, "_nlp", None)
+
+    assert nlp_utils.extract_keywords_batch(["Hello world!", ""]) == [["hello", "world"], []]
+
+
+def test_extract_keywords_fallback_orders_by_frequency(monkeypatch):
+    """Fallback keywords are most frequent first, ties kept in first-seen order."""
+    monkeypatch.setattr(nlp_utils, "_nlp", None)
+
+    text = "salt, pepper; garlic. Garlic and pepper... GARLIC! 12oz"
+    assert nlp_utils.extract_keywords(text) == ["garlic", "pepper", "salt", "and"]
+
+
+def test_pipeline_loads_lazily_and_falls_back_without_spacy(monkeypatch):
+    """The pipeline is loaded on first use; a failing spaCy import selects the fallback."""
+    monkeypatch.setattr(nlp_utils, "_nlp", nlp_utils._UNLOADED)  # pylint: disable=protected-access
+    monkeypatch.setitem(sys.modules, "spacy", None)
+
+    assert nlp_utils.extract_keywords("Hello hello world") == ["hello", "world"]
+    assert nlp_utils._nlp is None  # pylint: disable=protected-access